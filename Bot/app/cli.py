@@ -0,0 +1,239 @@
+"""
+Modo sin interfaz: ejecuta la automatización sin Qt.
+
+Uso (desde la carpeta Bot):
+    python -m app.cli run --profile nabil.json --elements PataPicoAmarillo,BotonReparar --duration 90s
+    python -m app.cli autocalibrate --profile nabil.json --source logs/sesion_20240101_120000.sesion
+    python -m app.cli check-pyramid --source "test_images/Captura de pantalla (1).png" --levels 1,2
+
+Solo se importa lo que pide el comando: nada de PySide6 ni keyboard, y pydirectinput
+únicamente al hacer el primer clic real (nunca en --dry-run).
+"""
+import argparse
+import json
+import logging
+import re
+import signal
+import sys
+
+log = logging.getLogger("QA_Tool.cli")
+
+def parse_duracion(texto):
+    """Convierte 'HH:MM', 'MM' (minutos, como en la GUI) o 'Ns' (segundos) a segundos."""
+    texto = texto.strip()
+    match_seg = re.fullmatch(r"(\d+)s", texto)
+    match_hhmm = re.fullmatch(r"(\d+):(\d{1,2})", texto)
+    match_mm = re.fullmatch(r"(\d+)", texto)
+    if match_seg:
+        return int(match_seg.group(1))
+    if match_hhmm:
+        return int(match_hhmm.group(1)) * 3600 + int(match_hhmm.group(2)) * 60
+    if match_mm:
+        return int(match_mm.group(1)) * 60
+    raise argparse.ArgumentTypeError(f"Duración inválida: '{texto}' (use HH:MM, minutos o segundos con 's')")
+
+def parse_instancia(texto):
+    """'[nombre=]perfil.json[@x,y,w,h]' -> definición de instancia (ver instancias.parsear_instancia)."""
+    from app.logic.instancias import parsear_instancia
+    try:
+        return parsear_instancia(texto)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def construir_config_elementos(nombres, ruta_config=None):
+    """
+    Configuración de elementos equivalente a la de la pestaña de elementos.
+    :param nombres: Nombres de plantillas de resources/templates (vacío = todas).
+    :param ruta_config: JSON opcional { nombre: {opciones} } que sobrescribe los valores por defecto.
+    """
+    from app.utils.config import listar_plantillas
+
+    plantillas = listar_plantillas()
+    nombres = nombres or list(plantillas)
+    faltan = [n for n in nombres if n not in plantillas]
+    if faltan:
+        raise ValueError(f"Plantillas no encontradas: {', '.join(faltan)}")
+
+    opciones = {}
+    if ruta_config:
+        with open(ruta_config, 'r') as f:
+            opciones = json.load(f)
+
+    config_elementos = {}
+    for nombre in nombres:
+        config_elementos[nombre] = {
+            "path_template": plantillas[nombre],
+            "niveles_piramide": 0,
+            "ventana_refinado": 8,
+            "objetivo_unico": True,
+            "tiempo_reaparicion": 0,
+            "cosecha": False,
+        }
+        config_elementos[nombre].update(opciones.get(nombre, {}))
+    return config_elementos
+
+def comando_run(args):
+    from app.logic.motor_automatizacion import MotorAutomatizacion
+
+    try:
+        config_elementos = construir_config_elementos(args.elements, args.element_config)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    config_ejecucion = {
+        "duracion_seg": args.duration,
+        "dry_run": args.dry_run,
+        "fuente": args.source,
+        "ritmo_real": not args.fast,
+        "grabar_sesion": args.record,
+        "backend_vision": args.backend,
+    }
+    if args.source:
+        # Una ruta mal escrita es un error de uso, como en autocalibrate (el motor solo lo registraría)
+        from app.logic.fuentes import crear_fuente
+        try:
+            crear_fuente(args.source).geometria()
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+
+    if args.instance:
+        # --profile es la primera ventana; cada --instance añade otra
+        config_ejecucion["instancias"] = [{"perfil": args.profile}] + args.instance
+
+    motor = MotorAutomatizacion(
+        config_ejecucion, config_elementos, args.profile,
+        al_log=print,
+        al_estado=lambda estado: log.debug(f"Estado: {estado}"),
+    )
+    # Ctrl+C = parada segura (el bucle termina en menos de un segundo)
+    signal.signal(signal.SIGINT, lambda *_: motor.detener())
+    motor.ejecutar()
+
+    print(json.dumps(motor.contadores))
+    return 1 if not getattr(motor, "instancias", None) else 0
+
+def comando_autocalibrar(args):
+    from app.logic.autocalibracion import descubrir_zonas, aplicar_a_perfil
+    from app.utils.config import listar_plantillas
+
+    plantillas = listar_plantillas()
+    nombres = args.elements or list(plantillas)
+    faltan = [n for n in nombres if n not in plantillas]
+    if faltan:
+        print(f"Error: Plantillas no encontradas: {', '.join(faltan)}", file=sys.stderr)
+        return 2
+
+    try:
+        zonas, estadisticas, resolucion = descubrir_zonas(args.source, {n: plantillas[n] for n in nombres},
+                                              threshold=args.threshold, margen=args.margin,
+                                              max_fotogramas=args.max_frames, paso=args.step)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    print(json.dumps(estadisticas, indent=2))
+    if args.dry_run:
+        return 0
+    escritas = aplicar_a_perfil(args.profile, zonas, sobrescribir=args.overwrite, resolucion=resolucion)
+    if escritas is None:
+        return 1
+    print(f"{len(escritas)} zonas escritas en {args.profile}: {', '.join(escritas) or '-'}")
+    return 0
+
+def comando_comprobar_piramide(args):
+    from app.logic.fuentes import crear_fuente
+    from app.logic.vision import comparar_piramide, find_best
+    from app.utils.config import listar_plantillas
+
+    plantillas = listar_plantillas()
+    nombres = args.elements or list(plantillas)
+    faltan = [n for n in nombres if n not in plantillas]
+    if faltan:
+        print(f"Error: Plantillas no encontradas: {', '.join(faltan)}", file=sys.stderr)
+        return 2
+
+    try:
+        fuente = crear_fuente(args.source, ritmo_real=False)
+        ancho, alto = fuente.geometria()
+        fuente.abrir()
+        try:
+            fotograma = fuente.leer_fotograma([(0, 0, ancho, alto)])
+        finally:
+            fuente.cerrar()
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    if fotograma is None:
+        print("Error: La fuente no tiene fotogramas.", file=sys.stderr)
+        return 2
+    imagen = fotograma.regiones[0][1]
+
+    informe, discrepancias = {}, 0
+    for nombre in nombres:
+        completa = find_best(imagen, plantillas[nombre], threshold=args.threshold)
+        for niveles in args.levels:
+            completas, con_piramide, perdidas = comparar_piramide(imagen, plantillas[nombre], args.threshold, niveles)
+            mejor = find_best(imagen, plantillas[nombre], threshold=args.threshold, niveles_piramide=niveles)
+            ok = not perdidas and (mejor is None) == (completa is None)
+            discrepancias += not ok
+            informe[f"{nombre}@{niveles}"] = {"completa": len(completas), "piramide": len(con_piramide),
+                                             "perdidas": len(perdidas), "mejor_coincide": (mejor is None) == (completa is None)}
+    print(json.dumps(informe, indent=2))
+    return 1 if discrepancias else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Automatización sin interfaz gráfica.")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    run = subparsers.add_parser("run", help="Ejecuta la automatización con un perfil de calibración.")
+    run.add_argument("--profile", required=True, help="Perfil de calibración (archivo de resources/profiles).")
+    run.add_argument("--elements", type=lambda t: [n.strip() for n in t.split(",") if n.strip()], default=[],
+                     help="Elementos separados por coma (nombres de resources/templates). Vacío = todos.")
+    run.add_argument("--element-config", help="JSON { elemento: {opciones} } con umbral, intervalos, reaparición, etc.")
+    run.add_argument("--duration", type=parse_duracion, default=parse_duracion("30"),
+                     help="HH:MM, minutos o segundos con sufijo 's' (por defecto 30 minutos).")
+    run.add_argument("--dry-run", action="store_true", help="Solo logs, sin clics.")
+    run.add_argument("--source", help="Fuente de fotogramas: imagen, directorio, vídeo o .sesion (vacío = pantalla).")
+    run.add_argument("--fast", action="store_true", help="Reproducir la fuente lo más rápido posible.")
+    run.add_argument("--record", help="Grabar la sesión en este archivo .sesion.")
+    run.add_argument("--backend", choices=("hilos", "procesos"), default="hilos", help="Backend de coincidencias.")
+    run.add_argument("--instance", action="append", type=parse_instancia,
+                     help="Otra ventana (multi-instancia): [nombre=]perfil.json[@x,y,w,h]. Repetible.")
+    run.add_argument("-v", "--verbose", action="store_true", help="Mostrar el log INFO en consola.")
+    run.set_defaults(funcion=comando_run)
+
+    auto = subparsers.add_parser("autocalibrate", help="Propone zonas de búsqueda (<elemento>_ZonaBusqueda) a partir de una grabación.")
+    auto.add_argument("--profile", required=True, help="Perfil donde escribir las zonas (se crea si no existe).")
+    auto.add_argument("--source", help="Grabación: imagen, directorio, vídeo o .sesion (vacío = pantalla).")
+    auto.add_argument("--elements", type=lambda t: [n.strip() for n in t.split(",") if n.strip()], default=[],
+                      help="Elementos separados por coma (nombres de resources/templates). Vacío = todos.")
+    auto.add_argument("--threshold", type=float, default=0.75, help="Umbral de coincidencia (por defecto 0.75).")
+    auto.add_argument("--margin", type=int, default=16, help="Margen en px alrededor de las apariciones.")
+    auto.add_argument("--max-frames", type=int, default=200, help="Fotogramas analizados como máximo.")
+    auto.add_argument("--step", type=int, default=1, help="Analizar uno de cada N fotogramas.")
+    auto.add_argument("--overwrite", action="store_true", help="Sustituir zonas que ya existan en el perfil.")
+    auto.add_argument("--dry-run", action="store_true", help="Solo mostrar las zonas propuestas, sin escribir el perfil.")
+    auto.add_argument("-v", "--verbose", action="store_true", help="Mostrar el log INFO en consola.")
+    auto.set_defaults(funcion=comando_autocalibrar)
+
+    piramide = subparsers.add_parser("check-pyramid", help="Comprueba que el modo pirámide encuentra lo mismo que la búsqueda completa.")
+    piramide.add_argument("--source", required=True, help="Imagen, directorio, vídeo o .sesion (se usa el primer fotograma).")
+    piramide.add_argument("--elements", type=lambda t: [n.strip() for n in t.split(",") if n.strip()], default=[],
+                          help="Elementos separados por coma (nombres de resources/templates). Vacío = todos.")
+    piramide.add_argument("--levels", type=lambda t: [int(n) for n in t.split(",") if n.strip()], default=[1, 2],
+                          help="Niveles de pirámide a comprobar, separados por coma (por defecto 1,2).")
+    piramide.add_argument("--threshold", type=float, default=0.7, help="Umbral de coincidencia (por defecto 0.7).")
+    piramide.add_argument("-v", "--verbose", action="store_true", help="Mostrar el log INFO en consola.")
+    piramide.set_defaults(funcion=comando_comprobar_piramide)
+
+    args = parser.parse_args(argv)
+
+    from app.utils.logger import setup_logging
+    setup_logging(nivel_consola=logging.INFO if args.verbose else logging.WARNING)
+
+    return args.funcion(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
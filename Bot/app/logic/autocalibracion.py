@@ -0,0 +1,109 @@
+import logging
+import os
+
+from app.logic.fuentes import crear_fuente, FuenteImagen
+from app.logic.instancias import SUFIJO_ZONA_BUSQUEDA
+from app.logic.vision import find_template
+from app.utils.config import guardar_perfil, cargar_perfil, normalizar_zonas, CLAVE_RESOLUCION, RUTA_PERFILES
+
+log = logging.getLogger("QA_Tool.autocalibracion")
+
+def _caja_envolvente(rects):
+    x0 = min(x for x, _, _, _ in rects)
+    y0 = min(y for _, y, _, _ in rects)
+    x1 = max(x + w for x, _, w, _ in rects)
+    y1 = max(y + h for _, y, _, h in rects)
+    return (x0, y0, x1 - x0, y1 - y0)
+
+def _ampliar(rect, margen, ancho, alto):
+    """Amplía el rectángulo `margen` px por cada lado, recortado a la pantalla."""
+    x, y, w, h = rect
+    x0, y0 = max(0, x - margen), max(0, y - margen)
+    x1, y1 = min(ancho, x + w + margen), min(alto, y + h + margen)
+    return (x0, y0, x1 - x0, y1 - y0)
+
+def descubrir_zonas(origen, plantillas, threshold=0.75, margen=16, max_fotogramas=200, paso=1,
+                    min_apariciones=1, fraccion_max=0.6, al_progreso=None):
+    """
+    Pasa cada plantilla por los fotogramas de una grabación y propone, por elemento,
+    la caja donde realmente aparece (envolvente de todas sus coincidencias) ampliada con un margen.
+
+    :param origen: Grabación como en crear_fuente (imagen, directorio, vídeo o .sesion); None = pantalla.
+    :param plantillas: { nombre_elemento: ruta_plantilla }.
+    :param threshold: Umbral de las coincidencias (más estricto que el de ejecución: aquí un falso positivo agranda la zona).
+    :param margen: Píxeles añadidos por cada lado de la caja.
+    :param max_fotogramas: Fotogramas analizados como máximo.
+    :param paso: Analizar uno de cada `paso` fotogramas.
+    :param min_apariciones: Coincidencias mínimas para proponer una zona.
+    :param fraccion_max: Si la zona cubriría más de esta fracción de la pantalla no se propone (no ahorra nada).
+    :param al_progreso: Callable(fotogramas_analizados), opcional.
+    :return: (zonas { "<elem>_ZonaBusqueda": (x, y, w, h) }, estadisticas { elem: {...} },
+              (ancho, alto) de la grabación)
+    """
+    fuente = crear_fuente(origen, ritmo_real=not origen)
+    if isinstance(fuente, FuenteImagen):
+        fuente.max_fotogramas = 1 # Una imagen fija se repite: basta con analizarla una vez
+    ancho, alto = fuente.geometria()
+    pantalla = [(0, 0, ancho, alto)]
+    apariciones = {nombre: [] for nombre in plantillas}
+    mejores = {nombre: 0.0 for nombre in plantillas}
+    fotogramas = leidos = 0
+
+    fuente.abrir()
+    try:
+        while fotogramas < max_fotogramas:
+            fotograma = fuente.leer_fotograma(pantalla)
+            if fotograma is None:
+                break # Fuente agotada
+            leidos += 1
+            if (leidos - 1) % max(1, paso):
+                continue
+            imagen = fotograma.regiones[0][1]
+            for nombre, ruta in plantillas.items():
+                for (x, y, w, h, puntuacion) in find_template(imagen, ruta, threshold=threshold):
+                    apariciones[nombre].append((x, y, w, h))
+                    mejores[nombre] = max(mejores[nombre], puntuacion)
+            fotogramas += 1
+            if al_progreso:
+                al_progreso(fotogramas)
+    finally:
+        fuente.cerrar()
+
+    zonas, estadisticas = {}, {}
+    for nombre, rects in apariciones.items():
+        zona = None
+        if len(rects) >= min_apariciones and rects:
+            zona = _ampliar(_caja_envolvente(rects), margen, ancho, alto)
+            if zona[2] * zona[3] > fraccion_max * ancho * alto:
+                log.info(f"'{nombre}': aparece por casi toda la pantalla {zona}, no se propone zona.")
+                zona = None
+        if zona:
+            zonas[f"{nombre}{SUFIJO_ZONA_BUSQUEDA}"] = zona
+        estadisticas[nombre] = {"apariciones": len(rects), "mejor": round(mejores[nombre], 3), "zona": zona}
+    log.info(f"Autocalibración sobre {fotogramas} fotogramas: {len(zonas)}/{len(plantillas)} zonas propuestas.")
+    return zonas, estadisticas, (ancho, alto)
+
+def aplicar_a_perfil(nombre_perfil, zonas, sobrescribir=False, resolucion=None):
+    """
+    Añade las zonas propuestas a un perfil (lo crea si no existe) y lo guarda con guardar_perfil.
+    Sin `sobrescribir`, las zonas ya calibradas a mano se respetan.
+
+    :param resolucion: (ancho, alto) en que están las zonas. Si se indica, los perfiles
+                       nuevos se crean normalizados y en los normalizados las zonas se normalizan.
+    :return: Lista de zonas escritas, o None si no se pudo guardar.
+    """
+    perfil = {}
+    if os.path.exists(os.path.join(RUTA_PERFILES, nombre_perfil)):
+        perfil = cargar_perfil(nombre_perfil)
+        if perfil is None:
+            return None # JSON ilegible: mejor no pisarlo
+    normalizado = resolucion is not None and (CLAVE_RESOLUCION in perfil or not perfil)
+    if normalizado and not perfil:
+        perfil[CLAVE_RESOLUCION] = [int(resolucion[0]), int(resolucion[1])]
+    escritas = [nombre for nombre in zonas if sobrescribir or nombre not in perfil]
+    for nombre in escritas:
+        perfil[nombre] = normalizar_zonas({nombre: zonas[nombre]}, resolucion)[nombre] if normalizado else list(zonas[nombre])
+    if not guardar_perfil(nombre_perfil, perfil):
+        return None
+    log.info(f"Perfil {nombre_perfil}: {len(escritas)} zonas de búsqueda escritas.")
+    return escritas
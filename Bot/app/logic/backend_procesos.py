@@ -0,0 +1,104 @@
+import cv2
+import numpy as np
+import logging
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from app.logic.vision import template_store
+from app.logic.motor_vision import buscar_con_ventanas
+
+log = logging.getLogger("QA_Tool.backend_procesos")
+
+MAX_SEGMENTOS_ABIERTOS = 32 # Segmentos de memoria compartida que cada proceso mantiene abiertos
+
+class BackendProcesos:
+    """
+    Backend de coincidencias sobre un pool de procesos.
+
+    Cada zona del fotograma se copia una sola vez en un segmento de
+    multiprocessing.shared_memory (reutilizado entre fotogramas) y los procesos
+    la leen sin copiarla: los píxeles nunca se serializan con pickle. Cada proceso
+    tiene su propia caché de plantillas ya cargadas y solo devuelve tuplas
+    pequeñas (x, y, w, h, puntuacion).
+    """
+    def __init__(self, max_procesos=None, escala_grises=False, rutas_plantillas=()):
+        self.escala_grises = escala_grises
+        self.max_procesos = max_procesos or max(1, (os.cpu_count() or 2) - 1)
+        # "spawn": el worker es un QThread y hacer fork de un proceso con hilos no es seguro
+        self._pool = ProcessPoolExecutor(max_workers=self.max_procesos,
+                                         mp_context=multiprocessing.get_context("spawn"),
+                                         initializer=_inicializar_proceso,
+                                         initargs=(tuple(rutas_plantillas), escala_grises))
+        self._segmentos = {} # { clave de zona: SharedMemory }
+        log.info(f"Backend de procesos inicializado ({self.max_procesos} procesos).")
+
+    def publicar(self, clave, imagen):
+        """
+        Copia la imagen de una zona en su segmento de memoria compartida.
+        :return: Descriptor (nombre, forma, dtype) para enviar() con los trabajos de la zona.
+        """
+        segmento = self._segmentos.get(clave)
+        if segmento is None or segmento.size < imagen.nbytes:
+            if segmento is not None:
+                segmento.close()
+                segmento.unlink()
+            segmento = shared_memory.SharedMemory(create=True, size=max(imagen.nbytes, 1))
+            self._segmentos[clave] = segmento
+        destino = np.ndarray(imagen.shape, dtype=imagen.dtype, buffer=segmento.buf)
+        destino[...] = imagen
+        return (segmento.name, imagen.shape, imagen.dtype.str)
+
+    def enviar(self, zona_compartida, ruta_plantilla, spec, ventanas=()):
+        """
+        Encola la búsqueda de un elemento sobre una zona publicada.
+        :return: Futuro con (coincidencias relativas a la zona, en_ventana), como buscar_con_ventanas.
+        """
+        return self._pool.submit(_buscar_en_proceso, zona_compartida, ruta_plantilla, spec, tuple(ventanas))
+
+    def cerrar(self):
+        """Detiene los procesos y libera los segmentos de memoria compartida."""
+        self._pool.shutdown(wait=True)
+        for segmento in self._segmentos.values():
+            segmento.close()
+            segmento.unlink()
+        self._segmentos.clear()
+
+# --- Lado del proceso del pool ---
+
+_escala_grises = False
+_segmentos_abiertos = OrderedDict() # { nombre: SharedMemory } (LRU)
+
+def _inicializar_proceso(rutas_plantillas, escala_grises):
+    global _escala_grises
+    _escala_grises = escala_grises
+    cv2.setNumThreads(1) # El paralelismo lo dan los procesos, no los hilos de OpenCV
+    for ruta in rutas_plantillas:
+        template_store.obtener(ruta)
+
+def _abrir_segmento(nombre):
+    segmento = _segmentos_abiertos.get(nombre)
+    if segmento is not None:
+        _segmentos_abiertos.move_to_end(nombre)
+        return segmento
+    segmento = shared_memory.SharedMemory(name=nombre)
+    _segmentos_abiertos[nombre] = segmento
+    while len(_segmentos_abiertos) > MAX_SEGMENTOS_ABIERTOS:
+        # Segmentos que el proceso principal ya reemplazó
+        _, viejo = _segmentos_abiertos.popitem(last=False)
+        viejo.close()
+    return segmento
+
+def _buscar_en_proceso(zona_compartida, ruta_plantilla, spec, ventanas):
+    nombre, forma, tipo = zona_compartida
+    imagen = np.ndarray(forma, dtype=np.dtype(tipo), buffer=_abrir_segmento(nombre).buf)
+    plantilla = template_store.obtener(ruta_plantilla)
+    if plantilla is None:
+        return [], False
+    if _escala_grises:
+        plantilla = plantilla.en_gris()
+    coincidencias, en_ventana = buscar_con_ventanas(imagen, plantilla, spec, None, ventanas)
+    del imagen # Sin vistas vivas el segmento se puede cerrar al salir de la caché
+    return [(int(x), int(y), int(w), int(h), float(p)) for (x, y, w, h, p) in coincidencias], en_ventana
@@ -0,0 +1,68 @@
+import cv2
+import numpy as np
+import time
+import logging
+
+log = logging.getLogger("QA_Tool.cambios")
+
+class DetectorCambios:
+    """
+    Detecta si una zona de la pantalla cambió desde la última vez que se analizó.
+    La firma de cada zona es una versión reducida en gris (una celda cada `tam_celda` píxeles),
+    así que comparar dos firmas cuesta muy poco frente a un matchTemplate.
+    """
+    def __init__(self, tolerancia=6, tam_celda=8, max_reutilizacion_seg=10.0):
+        self.tolerancia = tolerancia
+        self.tam_celda = max(1, tam_celda)
+        self.max_reutilizacion_seg = max_reutilizacion_seg
+        self._firmas = {} # { clave: (firma, instante_analisis) }
+        self.sin_cambios = 0
+        self.con_cambios = 0
+
+    def firma(self, imagen):
+        """Calcula la firma reducida de una imagen (BGR o gris)."""
+        if imagen.ndim == 3:
+            imagen = cv2.cvtColor(imagen, cv2.COLOR_BGR2GRAY)
+        alto, ancho = imagen.shape[:2]
+        tam = (max(1, ancho // self.tam_celda), max(1, alto // self.tam_celda))
+        return cv2.resize(imagen, tam, interpolation=cv2.INTER_AREA)
+
+    def cambio(self, clave, imagen=None, firma=None):
+        """
+        Indica si la zona `clave` cambió de forma apreciable.
+
+        Se compara contra la firma del último análisis (no del fotograma anterior), así que
+        un cambio lento que se acumula durante varios fotogramas también se detecta.
+        Si devuelve True, la firma nueva pasa a ser la referencia.
+        Se puede pasar la `firma` ya calculada de la imagen para compararla con varias claves.
+        """
+        firma_nueva = firma if firma is not None else self.firma(imagen)
+        ahora = time.monotonic()
+        previa = self._firmas.get(clave)
+
+        if previa is not None:
+            firma_previa, instante = previa
+            vigente = (ahora - instante) < self.max_reutilizacion_seg
+            if vigente and firma_previa.shape == firma_nueva.shape:
+                diferencia = cv2.absdiff(firma_previa, firma_nueva)
+                if int(np.max(diferencia)) <= self.tolerancia:
+                    self.sin_cambios += 1
+                    return False
+
+        self._firmas[clave] = (firma_nueva, ahora)
+        self.con_cambios += 1
+        return True
+
+    def fijar(self, clave, firma):
+        """Toma `firma` como referencia de `clave` (p. ej. la del fotograma que se va a analizar)."""
+        self._firmas[clave] = (firma, time.monotonic())
+
+    def olvidar(self, clave=None):
+        """Descarta la firma de una zona (o de todas) para forzar un nuevo análisis."""
+        if clave is None:
+            self._firmas.clear()
+        else:
+            self._firmas.pop(clave, None)
+
+    def estadisticas(self):
+        return {"sin_cambios": self.sin_cambios, "con_cambios": self.con_cambios}
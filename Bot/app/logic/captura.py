@@ -0,0 +1,279 @@
+import cv2
+import numpy as np
+import logging
+import threading
+import time
+
+log = logging.getLogger("QA_Tool.captura")
+
+class Fotograma:
+    """
+    Captura formada por una o varias regiones de la pantalla.
+    Todas las coordenadas son de pantalla (relativas al monitor capturado), así que
+    los rectángulos del perfil y los de click_en_rect se usan tal cual.
+    """
+    def __init__(self, regiones, ancho, alto):
+        self.regiones = regiones # [((x, y, w, h), imagen), ...]
+        self.ancho = ancho
+        self.alto = alto
+
+    @classmethod
+    def completo(cls, imagen):
+        """Envuelve una captura de pantalla completa."""
+        alto, ancho = imagen.shape[:2]
+        return cls([((0, 0, ancho, alto), imagen)], ancho, alto)
+
+    def convertir(self, codigo):
+        """Devuelve un Fotograma nuevo con cv2.cvtColor aplicado a cada región."""
+        regiones = [(rect, cv2.cvtColor(imagen, codigo)) for rect, imagen in self.regiones]
+        return Fotograma(regiones, self.ancho, self.alto)
+
+    def recortar(self, rect=None):
+        """
+        Devuelve (imagen, offset_x, offset_y) del rectángulo pedido.
+        Si ninguna región lo contiene entero se usa la que más lo cubre (recortado).
+
+        :return: La tupla, o None si el rectángulo cae fuera de lo capturado.
+        """
+        if rect is None:
+            rect = (0, 0, self.ancho, self.alto)
+        x, y, w, h = rect
+        mejor, area_mejor = None, 0
+        for (rx, ry, rw, rh), imagen in self.regiones:
+            x0, y0 = max(x, rx), max(y, ry)
+            x1, y1 = min(x + w, rx + rw), min(y + h, ry + rh)
+            area = max(0, x1 - x0) * max(0, y1 - y0)
+            if area > area_mejor:
+                mejor, area_mejor = (imagen[y0-ry:y1-ry, x0-rx:x1-rx], x0, y0), area
+                if area == w * h:
+                    break
+        return mejor
+
+    @property
+    def bytes_capturados(self):
+        return sum(imagen.nbytes for _, imagen in self.regiones)
+
+def _union(a, b):
+    x0, y0 = min(a[0], b[0]), min(a[1], b[1])
+    x1, y1 = max(a[0] + a[2], b[0] + b[2]), max(a[1] + a[3], b[1] + b[3])
+    return (x0, y0, x1 - x0, y1 - y0)
+
+def _cercanos(a, b, distancia):
+    return (a[0] - distancia <= b[0] + b[2] and b[0] - distancia <= a[0] + a[2] and
+            a[1] - distancia <= b[1] + b[3] and b[1] - distancia <= a[1] + a[3])
+
+def planificar_regiones(zonas, ancho, alto, distancia_fusion=64, fraccion_completa=0.6):
+    """
+    Calcula el conjunto mínimo de regiones a capturar para cubrir las zonas de búsqueda.
+
+    :param zonas: Lista de rectángulos (x, y, w, h); None significa "toda la pantalla".
+    :param ancho: Ancho del monitor.
+    :param alto: Alto del monitor.
+    :param distancia_fusion: Las zonas a menos de esta distancia se fusionan en una sola región.
+    :param fraccion_completa: Si las regiones cubren más de esta fracción, se captura todo de una vez.
+    :return: Lista de rectángulos (x, y, w, h) dentro del monitor.
+    """
+    completa = [(0, 0, ancho, alto)]
+    regiones = []
+    for zona in zonas:
+        if not zona:
+            return completa
+        x, y, w, h = zona
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(ancho, x + w), min(alto, y + h)
+        if x1 > x0 and y1 > y0:
+            regiones.append((x0, y0, x1 - x0, y1 - y0))
+    if not regiones:
+        return completa
+
+    # Fusionar regiones cercanas hasta que no queden pares por unir
+    fusionado = True
+    while fusionado:
+        fusionado = False
+        for i in range(len(regiones)):
+            for j in range(i + 1, len(regiones)):
+                if _cercanos(regiones[i], regiones[j], distancia_fusion):
+                    regiones[i] = _union(regiones[i], regiones[j])
+                    del regiones[j]
+                    fusionado = True
+                    break
+            if fusionado:
+                break
+
+    area = sum(w * h for _, _, w, h in regiones)
+    if area > fraccion_completa * ancho * alto:
+        return completa
+    return regiones
+
+class CuadroCapturado:
+    """
+    Fotograma publicado por HiloCaptura. Sus imágenes apuntan a buffers del anillo,
+    así que hay que liberarlo (o usarlo con `with`) en cuanto se termine de analizar.
+    """
+    def __init__(self, hilo, slot, fotograma, secuencia, instante):
+        self._hilo = hilo
+        self.slot = slot
+        self.fotograma = fotograma
+        self.secuencia = secuencia
+        self.instante = instante
+
+    def liberar(self):
+        if self._hilo is not None:
+            self._hilo._liberar(self.slot)
+            self._hilo = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.liberar()
+
+class HiloCaptura(threading.Thread):
+    """
+    Productor de capturas en su propio hilo.
+    Lee de una FuenteFotogramas (ver fuentes.py) hacia un anillo fijo de buffers preasignados,
+    sin reservar memoria por fotograma, y publica siempre el último con su número de secuencia
+    e instante de captura.
+
+    Con sin_perdidas=True (por defecto en fuentes sin ritmo real) no se publica un fotograma
+    nuevo hasta que el consumidor haya tomado el anterior, así una reproducción se analiza entera.
+
+    `al_publicar(fotograma, secuencia, instante)` se llama en este hilo con cada fotograma
+    publicado, se analice o no (p. ej. GrabadoraSesion.grabar_fotograma). Debe copiar lo que
+    necesite y volver enseguida: mientras tanto no se captura.
+    """
+    def __init__(self, fuente, regiones, tam_anillo=3, fps_max=20, sin_perdidas=None, al_publicar=None):
+        super().__init__(name="HiloCaptura", daemon=True)
+        self.fuente = fuente
+        self.ancho, self.alto = fuente.geometria()
+        self.regiones = list(regiones)
+        self.intervalo_min = 1.0 / fps_max if fps_max else 0.0
+        self.sin_perdidas = (not fuente.ritmo_real) if sin_perdidas is None else sin_perdidas
+        self.al_publicar = al_publicar
+
+        # Un juego de buffers BGR por posición del anillo (uno por región)
+        tam_anillo = max(3, tam_anillo) # Uno en uso, uno publicado y uno en escritura
+        self._buffers = [[np.empty((h, w, 3), dtype=np.uint8) for (_, _, w, h) in self.regiones]
+                         for _ in range(tam_anillo)]
+        self._en_uso = [0] * tam_anillo
+        self._cond = threading.Condition()
+        self._publicado = None # slot del último fotograma
+        self._secuencia = 0
+        self._entregado = 0 # Última secuencia tomada por el consumidor
+        self._instante = 0.0
+        self._detener = threading.Event()
+        self.agotada = False # La fuente no tiene más fotogramas (archivo/directorio/vídeo)
+        self.capturas = 0
+        self.descartes = 0 # Capturas sin buffer libre (el consumidor retiene demasiados)
+
+    def run(self):
+        log.info(f"Hilo de captura iniciado: {self.fuente.nombre}, {len(self.regiones)} regiones, "
+                 f"anillo de {len(self._buffers)}.")
+        try:
+            self.fuente.abrir()
+            while not self._detener.is_set():
+                if self.sin_perdidas:
+                    with self._cond:
+                        self._cond.wait_for(lambda: self._entregado >= self._secuencia or self._detener.is_set())
+                    if self._detener.is_set():
+                        break
+                inicio = time.monotonic()
+                slot = self._slot_libre()
+                if slot is None:
+                    self.descartes += 1
+                    self._detener.wait(0.005)
+                    continue
+                try:
+                    leido = self.fuente.leer(self.regiones, self._buffers[slot])
+                except Exception as e:
+                    log.error(f"Error en el hilo de captura: {e}")
+                    self._liberar(slot)
+                    self._detener.wait(0.5)
+                    continue
+                if not leido:
+                    self._liberar(slot)
+                    log.info("La fuente de fotogramas se agotó.")
+                    break
+
+                with self._cond:
+                    self._en_uso[slot] -= 1 # Fin de la escritura
+                    self._publicado = slot
+                    self._secuencia += 1
+                    # Instante en que empezó la lectura: un fotograma iniciado antes de que terminara
+                    # una acción no debe pasar por posterior a ella (no_antes_de, verificación)
+                    self._instante = inicio
+                    self.capturas += 1
+                    secuencia, instante = self._secuencia, self._instante
+                    self._cond.notify_all()
+
+                if self.al_publicar is not None:
+                    # El slot no se reescribe hasta la próxima lectura de este mismo hilo
+                    try:
+                        self.al_publicar(Fotograma(list(zip(self.regiones, self._buffers[slot])), self.ancho, self.alto),
+                                         secuencia, instante)
+                    except Exception as e:
+                        log.error(f"Error al publicar el fotograma {secuencia}: {e}")
+
+                espera = self.intervalo_min - (time.monotonic() - inicio)
+                if espera > 0:
+                    self._detener.wait(espera)
+        finally:
+            self.fuente.cerrar()
+            with self._cond:
+                self.agotada = not self._detener.is_set()
+                self._cond.notify_all()
+            log.info(f"Hilo de captura detenido ({self.capturas} capturas, {self.descartes} descartes).")
+
+    def _slot_libre(self):
+        """Reserva un slot que no esté publicado ni en uso por el consumidor."""
+        with self._cond:
+            for slot, en_uso in enumerate(self._en_uso):
+                if en_uso == 0 and slot != self._publicado:
+                    self._en_uso[slot] += 1
+                    return slot
+        return None
+
+    def _liberar(self, slot):
+        with self._cond:
+            self._en_uso[slot] -= 1
+
+    def adquirir(self, secuencia_previa=0, timeout=1.0):
+        """
+        Espera un fotograma más nuevo que `secuencia_previa` y lo reserva.
+
+        :return: CuadroCapturado (liberar al terminar) o None si se agotó el tiempo.
+        """
+        with self._cond:
+            listo = lambda: self._secuencia > secuencia_previa or self._detener.is_set() or self.agotada
+            if not self._cond.wait_for(listo, timeout):
+                return None
+            if self._publicado is None or self._secuencia <= secuencia_previa:
+                return None
+            slot = self._publicado
+            self._en_uso[slot] += 1
+            self._entregado = self._secuencia
+            self._cond.notify_all()
+            regiones = list(zip(self.regiones, self._buffers[slot]))
+            return CuadroCapturado(self, slot, Fotograma(regiones, self.ancho, self.alto),
+                                   self._secuencia, self._instante)
+
+    def observar(self, secuencia_previa=0):
+        """
+        Reserva el último fotograma publicado sin esperar y sin marcarlo como entregado
+        (no altera el ritmo de una reproducción sin pérdidas). Para vistas previas.
+
+        :return: CuadroCapturado (liberar cuanto antes) o None si no hay uno más nuevo.
+        """
+        with self._cond:
+            if self._publicado is None or self._secuencia <= secuencia_previa:
+                return None
+            slot = self._publicado
+            self._en_uso[slot] += 1
+            regiones = list(zip(self.regiones, self._buffers[slot]))
+            return CuadroCapturado(self, slot, Fotograma(regiones, self.ancho, self.alto),
+                                   self._secuencia, self._instante)
+
+    def detener(self):
+        self._detener.set()
+        with self._cond:
+            self._cond.notify_all()
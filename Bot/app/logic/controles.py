@@ -1,59 +1,328 @@
-import pydirectinput
-import random
-import time
-import logging
-
-log = logging.getLogger("QA_Tool.controles")
-
-# Configuración de seguridad
-pydirectinput.FAILSAFE = True 
-pydirectinput.PAUSE = 0.01
-
-def click_en_rect(rect, duracion_press=None, modo_dry_run=False):
-    """
-    Realiza un clic en una coordenada aleatoria dentro de un rectángulo dado.
-    """
-    x, y, w, h = rect
-    
-    # Asegurarse de que w y h no sean 0
-    w = max(1, w)
-    h = max(1, h)
-
-    # Calcular coordenada aleatoria dentro del AÁREA
-    rand_x = x + random.randint(0, w - 1)
-    rand_y = y + random.randint(0, h - 1)
-    
-    if modo_dry_run:
-        accion = f"Clic en ({rand_x}, {rand_y})"
-        if duracion_press:
-            accion = f"Mantener presionado en ({rand_x}, {rand_y}) por {duracion_press}s"
-        log.info(f"[DRY-RUN] {accion}")
-        return (rand_x, rand_y)
-
-    try:
-        log.debug(f"Realizando acción en ({rand_x}, {rand_y})")
-        if duracion_press:
-            pydirectinput.moveTo(rand_x, rand_y)
-            pydirectinput.mouseDown()
-            time.sleep(duracion_press)
-            pydirectinput.mouseUp()
-        else:
-            pydirectinput.click(rand_x, rand_y)
-            
-        return (rand_x, rand_y)
-        
-    except pydirectinput.FailSafeException:
-        log.critical("FAILSAFE ACTIVADO: Movimiento del mouse a (0,0) detectado.")
-        raise # Relanzar para que el worker lo capture
-    except Exception as e:
-        log.error(f"Error durante el clic: {e}")
-        
-def variar_tiempo_espera(min_seg, max_seg, modo_dry_run=False):
-    """Genera una espera aleatoria."""
-    espera = random.uniform(min_seg, max_seg)
-    if modo_dry_run:
-        log.info(f"[DRY-RUN] Esperando {espera:.2f} segundos...")
-    else:
-        log.debug(f"Esperando {espera:.2f} segundos...")
-        time.sleep(espera)
-    return espera
\ No newline at end of file
+import heapq
+import itertools
+import random
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import Future
+
+log = logging.getLogger("QA_Tool.controles")
+
+_pydirectinput = None
+
+class FailSafeActivado(Exception):
+    """El ratón se llevó a una esquina (failsafe de pydirectinput): hay que detener la automatización."""
+
+def _entrada():
+    """Importa y configura pydirectinput la primera vez que se necesita (nunca en dry-run)."""
+    global _pydirectinput
+    if _pydirectinput is None:
+        import pydirectinput
+        # Configuración de seguridad
+        pydirectinput.FAILSAFE = True 
+        pydirectinput.PAUSE = 0.01
+        _pydirectinput = pydirectinput
+    return _pydirectinput
+
+def punto_en_rect(rect):
+    """Devuelve una coordenada aleatoria (x, y) dentro de un rectángulo (x, y, w, h)."""
+    x, y, w, h = rect
+    
+    # Asegurarse de que w y h no sean 0
+    w = max(1, w)
+    h = max(1, h)
+
+    # Calcular coordenada aleatoria dentro del AÁREA
+    return x + random.randint(0, w - 1), y + random.randint(0, h - 1)
+
+def click_en_rect(rect, duracion_press=None, modo_dry_run=False):
+    """
+    Realiza un clic en una coordenada aleatoria dentro de un rectángulo dado.
+    Bloquea el hilo que llama; para no bloquear, usar EjecutorEntrada.
+    """
+    rand_x, rand_y = punto_en_rect(rect)
+    
+    if modo_dry_run:
+        accion = f"Clic en ({rand_x}, {rand_y})"
+        if duracion_press:
+            accion = f"Mantener presionado en ({rand_x}, {rand_y}) por {duracion_press}s"
+        log.info(f"[DRY-RUN] {accion}")
+        return (rand_x, rand_y)
+
+    pydirectinput = _entrada()
+    try:
+        log.debug(f"Realizando acción en ({rand_x}, {rand_y})")
+        if duracion_press:
+            pydirectinput.moveTo(rand_x, rand_y)
+            pydirectinput.mouseDown()
+            time.sleep(duracion_press)
+            pydirectinput.mouseUp()
+        else:
+            pydirectinput.click(rand_x, rand_y)
+            
+        return (rand_x, rand_y)
+        
+    except pydirectinput.FailSafeException as e:
+        log.critical("FAILSAFE ACTIVADO: Movimiento del mouse a (0,0) detectado.")
+        raise FailSafeActivado() from e # Relanzar para que el worker lo capture
+    except Exception as e:
+        log.error(f"Error durante el clic: {e}")
+        
+def variar_tiempo_espera(min_seg, max_seg, modo_dry_run=False):
+    """Genera una espera aleatoria."""
+    espera = random.uniform(min_seg, max_seg)
+    if modo_dry_run:
+        log.info(f"[DRY-RUN] Esperando {espera:.2f} segundos...")
+    else:
+        log.debug(f"Esperando {espera:.2f} segundos...")
+        time.sleep(espera)
+    return espera
+
+# --- Canal de entrada asíncrono ---
+
+class AccionInterrumpida(Exception):
+    """La acción se cortó a medias (pánico o detención) y los botones/teclas se soltaron."""
+
+class Accion:
+    """Acción de entrada. ejecutar() la realiza sobre un backend y debe poder cortarse con `interrumpir`."""
+    __slots__ = ()
+    tipo = "accion"
+
+    def ejecutar(self, backend, interrumpir):
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{self.tipo}({', '.join(f'{a}={getattr(self, a)}' for a in self.__slots__)})"
+
+class AccionClic(Accion):
+    __slots__ = ("x", "y", "boton")
+    tipo = "clic"
+
+    def __init__(self, x, y, boton="left"):
+        self.x, self.y, self.boton = x, y, boton
+
+    def ejecutar(self, backend, interrumpir):
+        backend.clic(self.x, self.y, self.boton)
+
+class AccionMantener(Accion):
+    __slots__ = ("x", "y", "duracion", "boton")
+    tipo = "mantener"
+
+    def __init__(self, x, y, duracion, boton="left"):
+        self.x, self.y, self.duracion, self.boton = x, y, duracion, boton
+
+    def ejecutar(self, backend, interrumpir):
+        backend.mover(self.x, self.y)
+        backend.presionar(self.boton)
+        try:
+            interrumpir.wait(self.duracion) # Espera cortable, en vez de time.sleep
+        finally:
+            backend.soltar(self.boton)
+
+class AccionArrastrar(Accion):
+    __slots__ = ("x0", "y0", "x1", "y1", "duracion", "pasos", "boton")
+    tipo = "arrastrar"
+
+    def __init__(self, x0, y0, x1, y1, duracion=0.3, pasos=10, boton="left"):
+        self.x0, self.y0, self.x1, self.y1 = x0, y0, x1, y1
+        self.duracion, self.pasos, self.boton = duracion, max(1, pasos), boton
+
+    def ejecutar(self, backend, interrumpir):
+        backend.mover(self.x0, self.y0)
+        backend.presionar(self.boton)
+        try:
+            for i in range(1, self.pasos + 1):
+                if interrumpir.wait(self.duracion / self.pasos):
+                    break
+                backend.mover(round(self.x0 + (self.x1 - self.x0) * i / self.pasos),
+                              round(self.y0 + (self.y1 - self.y0) * i / self.pasos))
+        finally:
+            backend.soltar(self.boton)
+
+class AccionTecla(Accion):
+    __slots__ = ("tecla", "duracion")
+    tipo = "tecla"
+
+    def __init__(self, tecla, duracion=0.0):
+        self.tecla, self.duracion = tecla, duracion
+
+    def ejecutar(self, backend, interrumpir):
+        backend.presionar_tecla(self.tecla)
+        try:
+            if self.duracion:
+                interrumpir.wait(self.duracion)
+        finally:
+            backend.soltar_tecla(self.tecla)
+
+class AccionSecuencia(Accion):
+    """Varias acciones seguidas como una sola entrada de la cola (no se intercalan otras)."""
+    __slots__ = ("acciones", "pausa")
+    tipo = "secuencia"
+
+    def __init__(self, acciones, pausa=0.0):
+        self.acciones, self.pausa = list(acciones), pausa
+
+    def ejecutar(self, backend, interrumpir):
+        for i, accion in enumerate(self.acciones):
+            if interrumpir.is_set():
+                break
+            accion.ejecutar(backend, interrumpir)
+            if self.pausa and i < len(self.acciones) - 1:
+                interrumpir.wait(self.pausa)
+
+class BackendPydirectinput:
+    """Entrada real con pydirectinput (Windows). La pausa entre acciones la pone el EjecutorEntrada."""
+    def __init__(self):
+        self._pdi = _entrada()
+
+    def _llamar(self, funcion, *args, **kwargs):
+        try:
+            # Sin pausa tras cada llamada de bajo nivel, solo en esta llamada: pydirectinput.PAUSE
+            # no se toca y los demás usuarios del módulo (p. ej. click_en_rect) mantienen la suya
+            funcion(*args, _pause=False, **kwargs)
+        except self._pdi.FailSafeException as e:
+            log.critical("FAILSAFE ACTIVADO: Movimiento del mouse a (0,0) detectado.")
+            raise FailSafeActivado() from e
+
+    def mover(self, x, y):
+        self._llamar(self._pdi.moveTo, x, y)
+
+    def clic(self, x, y, boton="left"):
+        self._llamar(self._pdi.click, x, y, button=boton)
+
+    def presionar(self, boton="left"):
+        self._llamar(self._pdi.mouseDown, button=boton)
+
+    def soltar(self, boton="left"):
+        self._llamar(self._pdi.mouseUp, button=boton)
+
+    def presionar_tecla(self, tecla):
+        self._llamar(self._pdi.keyDown, tecla)
+
+    def soltar_tecla(self, tecla):
+        self._llamar(self._pdi.keyUp, tecla)
+
+class BackendRegistro:
+    """
+    Backend sin efectos: registra las llamadas en vez de mover el ratón.
+    Sirve para dry-run, para Linux y para pruebas. Solo guarda las últimas
+    `max_registro` llamadas (None = todas); los contadores por operación son completos.
+    """
+    def __init__(self, dry_run=True, max_registro=1000):
+        self.dry_run = dry_run
+        self.registro = deque(maxlen=max_registro) # [(instante, operacion, argumentos)]
+        self.operaciones = {} # { operacion: llamadas }
+
+    def _anotar(self, operacion, *args):
+        self.registro.append((time.monotonic(), operacion, args))
+        self.operaciones[operacion] = self.operaciones.get(operacion, 0) + 1
+        if self.dry_run:
+            log.info(f"[DRY-RUN] {operacion}{args}")
+
+    def mover(self, x, y):
+        self._anotar("mover", x, y)
+
+    def clic(self, x, y, boton="left"):
+        self._anotar("clic", x, y, boton)
+
+    def presionar(self, boton="left"):
+        self._anotar("presionar", boton)
+
+    def soltar(self, boton="left"):
+        self._anotar("soltar", boton)
+
+    def presionar_tecla(self, tecla):
+        self._anotar("presionar_tecla", tecla)
+
+    def soltar_tecla(self, tecla):
+        self._anotar("soltar_tecla", tecla)
+
+class EjecutorEntrada(threading.Thread):
+    """
+    Hilo que ejecuta acciones de entrada de una cola con prioridad (menor = antes).
+
+    enviar() no bloquea: devuelve un Future que se completa con el instante
+    (time.monotonic()) en que terminó la acción. Las acciones pendientes se
+    pueden cancelar con future.cancel(); panico() vacía la cola y corta la
+    acción en curso (soltando botones y teclas). Un failsafe también vacía la cola.
+    """
+    def __init__(self, backend, pausa=0.01):
+        super().__init__(name="EjecutorEntrada", daemon=True)
+        self.backend = backend
+        self.pausa = pausa # Pausa entre acciones (equivale a pydirectinput.PAUSE, una vez por acción)
+        self._cola = [] # (prioridad, orden, accion, futuro)
+        self._orden = itertools.count()
+        self._condicion = threading.Condition()
+        self._interrumpir = threading.Event()
+        self._activo = True
+        self.ejecutadas = 0
+
+    def enviar(self, accion, prioridad=0):
+        """Encola una acción. :return: Future con el instante de fin de la acción."""
+        futuro = Future()
+        with self._condicion:
+            if not self._activo:
+                futuro.cancel()
+                return futuro
+            heapq.heappush(self._cola, (prioridad, next(self._orden), accion, futuro))
+            self._condicion.notify()
+        return futuro
+
+    def pendientes(self):
+        with self._condicion:
+            return len(self._cola)
+
+    def vaciar(self):
+        """Cancela todas las acciones que aún no empezaron. :return: Cuántas se descartaron."""
+        with self._condicion:
+            descartadas = self._cola
+            self._cola = []
+        for _, _, _, futuro in descartadas:
+            futuro.cancel()
+        if descartadas:
+            log.warning(f"Cola de entrada vaciada ({len(descartadas)} acciones descartadas).")
+        return len(descartadas)
+
+    def panico(self):
+        """Vacía la cola y corta la acción en curso."""
+        with self._condicion:
+            self._interrumpir.set()
+        self.vaciar()
+
+    def detener(self):
+        with self._condicion:
+            self._activo = False
+            self._condicion.notify()
+        self.panico()
+
+    def run(self):
+        while True:
+            with self._condicion:
+                while self._activo and not self._cola:
+                    self._condicion.wait()
+                if not self._activo:
+                    break
+                _, _, accion, futuro = heapq.heappop(self._cola)
+                self._interrumpir.clear() # Un pánico posterior a este punto corta esta acción
+            if not futuro.set_running_or_notify_cancel():
+                continue # Cancelada mientras esperaba en la cola
+
+            try:
+                accion.ejecutar(self.backend, self._interrumpir)
+            except FailSafeActivado as e:
+                futuro.set_exception(e)
+                self.vaciar()
+                continue
+            except Exception as e:
+                log.error(f"Error durante {accion}: {e}")
+                futuro.set_exception(e)
+                continue
+            self.ejecutadas += 1
+
+            if self._interrumpir.is_set():
+                futuro.set_exception(AccionInterrumpida(repr(accion)))
+            else:
+                futuro.set_result(time.monotonic())
+            if self.pausa:
+                time.sleep(self.pausa)
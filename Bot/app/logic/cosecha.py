@@ -0,0 +1,71 @@
+import math
+import logging
+
+log = logging.getLogger("QA_Tool.cosecha")
+
+def _distancia(a, b):
+    return math.hypot(a[0] - b[0], a[1] - b[1])
+
+def longitud_recorrido(puntos, orden, origen=None):
+    """Distancia total que recorre el puntero visitando `puntos` en `orden` (desde `origen`, si se da)."""
+    total = 0.0
+    previo = origen
+    for i in orden:
+        if previo is not None:
+            total += _distancia(previo, puntos[i])
+        previo = puntos[i]
+    return total
+
+def _vecino_mas_cercano(puntos, origen):
+    pendientes = set(range(len(puntos)))
+    if origen is None:
+        actual = 0 # Sin posición previa del puntero: empezar por la mejor coincidencia
+    else:
+        actual = min(pendientes, key=lambda i: _distancia(origen, puntos[i]))
+    orden = [actual]
+    pendientes.discard(actual)
+    while pendientes:
+        actual = min(pendientes, key=lambda i: _distancia(puntos[actual], puntos[i]))
+        orden.append(actual)
+        pendientes.discard(actual)
+    return orden
+
+def _mejorar_2opt(puntos, orden, origen, max_pasadas=10):
+    """Invierte tramos del recorrido (camino abierto) mientras se acorte."""
+    # Con origen, el primer tramo sale del puntero y el primer punto también se puede mover
+    ruta = ([origen] if origen is not None else []) + [puntos[i] for i in orden]
+    indices = ([None] if origen is not None else []) + list(orden)
+    inicio = 1 # El primer nodo (origen o primer punto) queda fijo
+    for _ in range(max_pasadas):
+        mejorado = False
+        for i in range(inicio, len(ruta) - 1):
+            for j in range(i + 1, len(ruta)):
+                antes = _distancia(ruta[i - 1], ruta[i])
+                despues = _distancia(ruta[i - 1], ruta[j])
+                if j + 1 < len(ruta):
+                    antes += _distancia(ruta[j], ruta[j + 1])
+                    despues += _distancia(ruta[i], ruta[j + 1])
+                if despues < antes - 1e-9:
+                    ruta[i:j + 1] = ruta[i:j + 1][::-1]
+                    indices[i:j + 1] = indices[i:j + 1][::-1]
+                    mejorado = True
+        if not mejorado:
+            break
+    return [i for i in indices if i is not None]
+
+def ordenar_recorrido(puntos, origen=None, mejora_2opt=True):
+    """
+    Ordena los puntos a clicar para minimizar el recorrido del puntero:
+    vecino más cercano desde `origen` y, opcionalmente, mejora 2-opt.
+
+    :param puntos: Lista de (x, y).
+    :param origen: Posición actual del puntero (x, y), o None.
+    :return: Índices de `puntos` en orden de visita.
+    """
+    if len(puntos) <= 1:
+        return list(range(len(puntos)))
+    orden = _vecino_mas_cercano(puntos, origen)
+    if mejora_2opt and len(puntos) > 2:
+        orden = _mejorar_2opt(puntos, orden, origen)
+    log.debug(f"Recorrido de cosecha: {len(puntos)} puntos, {longitud_recorrido(puntos, orden, origen):.0f} px")
+    return orden
@@ -0,0 +1,61 @@
+import cv2
+import hashlib
+import logging
+import os
+import threading
+
+log = logging.getLogger("QA_Tool.escalado")
+
+RUTA_CACHE_ESCALADAS = "resources/cache_plantillas" # Una carpeta por par de resoluciones
+
+_lock = threading.Lock()
+
+def carpeta_escaladas(origen, destino, ruta_cache=RUTA_CACHE_ESCALADAS):
+    """Carpeta de la caché para plantillas calibradas a `origen` (ancho, alto) y usadas a `destino`."""
+    return os.path.join(ruta_cache, f"{origen[0]}x{origen[1]}_a_{destino[0]}x{destino[1]}")
+
+def nombre_en_cache(ruta):
+    """
+    Nombre de la copia escalada: hash de la ruta normalizada + nombre original, para que
+    dos plantillas con el mismo nombre en carpetas distintas no compartan copia.
+    """
+    normalizada = os.path.normcase(os.path.abspath(ruta))
+    return f"{hashlib.sha1(normalizada.encode()).hexdigest()[:10]}_{os.path.basename(ruta)}"
+
+def plantilla_escalada(ruta, origen, destino, ruta_cache=RUTA_CACHE_ESCALADAS):
+    """
+    Devuelve la ruta de la plantilla reescalada de la resolución `origen` a `destino`.
+    Se genera una sola vez y queda en disco: en ejecuciones posteriores a la misma
+    resolución se reutiliza (salvo que la plantilla original sea más reciente).
+    Así no hace falta buscar a varias escalas en cada fotograma.
+
+    :param ruta: Ruta de la plantilla original (capturada a la resolución `origen`).
+    :return: Ruta de la plantilla a usar (la original si no hay cambio de escala o falla el escalado).
+    """
+    origen, destino = tuple(origen), tuple(destino)
+    if origen == destino:
+        return ruta
+    carpeta = carpeta_escaladas(origen, destino, ruta_cache)
+    ruta_escalada = os.path.join(carpeta, nombre_en_cache(ruta))
+
+    with _lock: # Varias instancias pueden pedir la misma plantilla a la vez
+        try:
+            if os.path.exists(ruta_escalada) and os.path.getmtime(ruta_escalada) >= os.path.getmtime(ruta):
+                return ruta_escalada
+            imagen = cv2.imread(ruta, cv2.IMREAD_UNCHANGED)
+            if imagen is None:
+                log.warning(f"No se pudo cargar la plantilla {ruta} para escalarla.")
+                return ruta
+            escala_x, escala_y = destino[0] / origen[0], destino[1] / origen[1]
+            alto, ancho = imagen.shape[:2]
+            tam = (max(1, round(ancho * escala_x)), max(1, round(alto * escala_y)))
+            # INTER_AREA al reducir (sin aliasing), INTER_CUBIC al ampliar
+            interpolacion = cv2.INTER_AREA if escala_x * escala_y < 1 else cv2.INTER_CUBIC
+            os.makedirs(carpeta, exist_ok=True)
+            if not cv2.imwrite(ruta_escalada, cv2.resize(imagen, tam, interpolation=interpolacion)):
+                raise OSError(f"no se pudo escribir {ruta_escalada}")
+            log.info(f"Plantilla {os.path.basename(ruta)} escalada {ancho}x{alto} -> {tam[0]}x{tam[1]} ({carpeta})")
+            return ruta_escalada
+        except OSError as e:
+            log.error(f"Error al escalar la plantilla {ruta}: {e}")
+            return ruta
@@ -0,0 +1,280 @@
+import cv2
+import numpy as np
+import os
+import time
+import logging
+
+from app.logic.captura import Fotograma
+from app.logic.grabadora import LectorSesion
+
+log = logging.getLogger("QA_Tool.fuentes")
+
+EXTENSIONES_IMAGEN = (".png", ".jpg", ".jpeg", ".bmp")
+EXTENSIONES_VIDEO = (".mp4", ".avi", ".mkv", ".mov", ".webm")
+EXTENSION_SESION = ".sesion"
+
+class FuenteFotogramas:
+    """
+    Interfaz común de las fuentes de fotogramas (pantalla en vivo, imagen, directorio, vídeo).
+
+    Con ritmo_real=True la fuente entrega los fotogramas a su ritmo nominal (fps);
+    con ritmo_real=False los entrega tan rápido como se pidan (benchmarks, regresión).
+    """
+    nombre = "fuente"
+
+    def __init__(self, fps=10.0, ritmo_real=True):
+        self.fps = fps
+        self.ritmo_real = ritmo_real
+        self._inicio = None
+        self._leidos = 0
+
+    def geometria(self):
+        """Devuelve (ancho, alto) de la pantalla que representa la fuente."""
+        raise NotImplementedError
+
+    def abrir(self):
+        """Prepara la fuente. Se llama desde el hilo que va a leer."""
+        self._inicio = None
+        self._leidos = 0
+
+    def leer(self, regiones, destino):
+        """
+        Copia las regiones (x, y, w, h) del siguiente fotograma en los buffers BGR de `destino`.
+
+        :return: True si se leyó un fotograma, False si la fuente se agotó.
+        """
+        raise NotImplementedError
+
+    def cerrar(self):
+        pass
+
+    def leer_fotograma(self, regiones):
+        """Lee un fotograma reservando buffers nuevos. Devuelve Fotograma o None al agotarse."""
+        destino = [np.empty((h, w, 3), dtype=np.uint8) for (_, _, w, h) in regiones]
+        if not self.leer(regiones, destino):
+            return None
+        ancho, alto = self.geometria()
+        return Fotograma(list(zip(regiones, destino)), ancho, alto)
+
+    def _esperar_ritmo(self):
+        """En modo ritmo real, duerme hasta el instante nominal del siguiente fotograma."""
+        ahora = time.monotonic()
+        if self._inicio is None:
+            self._inicio = ahora
+        if self.ritmo_real and self.fps:
+            espera = self._inicio + self._leidos / self.fps - ahora
+            if espera > 0:
+                time.sleep(espera)
+        self._leidos += 1
+
+def _copiar_regiones(imagen, regiones, destino):
+    """Copia cada región de `imagen` en su buffer; lo que cae fuera de la imagen queda en negro."""
+    alto, ancho = imagen.shape[:2]
+    for (x, y, w, h), buffer in zip(regiones, destino):
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(ancho, x + w), min(alto, y + h)
+        if x1 - x0 < w or y1 - y0 < h:
+            buffer.fill(0)
+        if x1 > x0 and y1 > y0:
+            buffer[y0-y:y1-y, x0-x:x1-x] = imagen[y0:y1, x0:x1]
+
+class FuenteMss(FuenteFotogramas):
+    """Captura en vivo de un monitor con mss (np.frombuffer + cvtColor sobre el buffer destino)."""
+    nombre = "mss"
+
+    def __init__(self, indice_monitor=1):
+        super().__init__(fps=None, ritmo_real=True)
+        self.indice_monitor = indice_monitor
+        self.monitor = None
+        self._sct = None
+
+    def geometria(self):
+        if self.monitor is None:
+            import mss
+            with mss.mss() as sct:
+                self.monitor = sct.monitors[self.indice_monitor]
+        return self.monitor["width"], self.monitor["height"]
+
+    def abrir(self):
+        super().abrir()
+        import mss # mss debe crearse en el mismo hilo que captura
+        self.geometria()
+        self._sct = mss.mss()
+
+    def leer(self, regiones, destino):
+        for (x, y, w, h), buffer in zip(regiones, destino):
+            area = {"left": self.monitor["left"] + x, "top": self.monitor["top"] + y, "width": w, "height": h}
+            sct_img = self._sct.grab(area)
+            bgra = np.frombuffer(sct_img.raw, dtype=np.uint8).reshape(h, w, 4)
+            cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=buffer)
+        return True
+
+    def cerrar(self):
+        if self._sct is not None:
+            self._sct.close()
+            self._sct = None
+
+class FuenteImagen(FuenteFotogramas):
+    """Repite una sola imagen (p. ej. test_images/Captura de pantalla (1).png)."""
+    nombre = "imagen"
+
+    def __init__(self, ruta, fps=10.0, ritmo_real=True, max_fotogramas=None):
+        super().__init__(fps, ritmo_real)
+        self.ruta = ruta
+        self.max_fotogramas = max_fotogramas
+        self.imagen = cv2.imread(ruta)
+        if self.imagen is None:
+            raise ValueError(f"No se pudo cargar la imagen {ruta}")
+
+    def geometria(self):
+        alto, ancho = self.imagen.shape[:2]
+        return ancho, alto
+
+    def leer(self, regiones, destino):
+        if self.max_fotogramas is not None and self._leidos >= self.max_fotogramas:
+            return False
+        self._esperar_ritmo()
+        _copiar_regiones(self.imagen, regiones, destino)
+        return True
+
+class FuenteDirectorio(FuenteFotogramas):
+    """Reproduce en orden alfabético las imágenes de un directorio."""
+    nombre = "directorio"
+
+    def __init__(self, ruta, fps=10.0, ritmo_real=True, bucle=False):
+        super().__init__(fps, ritmo_real)
+        self.ruta = ruta
+        self.bucle = bucle
+        self.archivos = sorted(os.path.join(ruta, f) for f in os.listdir(ruta)
+                               if f.lower().endswith(EXTENSIONES_IMAGEN))
+        if not self.archivos:
+            raise ValueError(f"No hay imágenes en {ruta}")
+        self._indice = 0
+        self._geometria = None
+
+    def geometria(self):
+        if self._geometria is None:
+            # La del primer fotograma legible (leer() también se salta los que no lo son)
+            for ruta in self.archivos:
+                imagen = cv2.imread(ruta)
+                if imagen is not None:
+                    self._geometria = (imagen.shape[1], imagen.shape[0])
+                    break
+                log.warning(f"No se pudo leer el fotograma {ruta}. Se omite.")
+            else:
+                raise ValueError(f"No hay imágenes legibles en {self.ruta}")
+        return self._geometria
+
+    def abrir(self):
+        super().abrir()
+        self._indice = 0
+
+    def leer(self, regiones, destino):
+        while True:
+            if self._indice >= len(self.archivos):
+                if not self.bucle:
+                    return False
+                self._indice = 0
+            ruta = self.archivos[self._indice]
+            self._indice += 1
+            imagen = cv2.imread(ruta)
+            if imagen is not None:
+                break
+            log.warning(f"No se pudo leer el fotograma {ruta}. Se omite.")
+        self._esperar_ritmo()
+        _copiar_regiones(imagen, regiones, destino)
+        return True
+
+class FuenteVideo(FuenteFotogramas):
+    """Reproduce un archivo de vídeo con cv2.VideoCapture."""
+    nombre = "video"
+
+    def __init__(self, ruta, ritmo_real=True, bucle=False):
+        super().__init__(None, ritmo_real)
+        self.ruta = ruta
+        self.bucle = bucle
+        self._captura = None
+        captura = cv2.VideoCapture(ruta)
+        if not captura.isOpened():
+            raise ValueError(f"No se pudo abrir el vídeo {ruta}")
+        self.fps = captura.get(cv2.CAP_PROP_FPS) or 30.0
+        self._geometria = (int(captura.get(cv2.CAP_PROP_FRAME_WIDTH)), int(captura.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        captura.release()
+        self._imagen = None
+
+    def geometria(self):
+        return self._geometria
+
+    def abrir(self):
+        super().abrir()
+        self._captura = cv2.VideoCapture(self.ruta)
+
+    def leer(self, regiones, destino):
+        ok, self._imagen = self._captura.read(self._imagen)
+        if not ok and self.bucle:
+            self._captura.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, self._imagen = self._captura.read(self._imagen)
+        if not ok:
+            return False
+        self._esperar_ritmo()
+        _copiar_regiones(self._imagen, regiones, destino)
+        return True
+
+    def cerrar(self):
+        if self._captura is not None:
+            self._captura.release()
+            self._captura = None
+
+class FuenteSesion(FuenteFotogramas):
+    """Reproduce los fotogramas de una sesión grabada (ver grabadora.py) con sus tiempos originales."""
+    nombre = "sesion"
+
+    def __init__(self, ruta, ritmo_real=True):
+        super().__init__(None, ritmo_real)
+        self.lector = LectorSesion(ruta)
+        self._lienzo = None
+        self._registros = None
+
+    def geometria(self):
+        return self.lector.ancho, self.lector.alto
+
+    def abrir(self):
+        super().abrir()
+        self._registros = iter(self.lector)
+        # Las regiones grabadas se pegan en un lienzo de pantalla completa para poder
+        # servir cualquier plan de captura (aunque no coincida con el de la grabación)
+        self._lienzo = np.zeros((self.lector.alto, self.lector.ancho, 3), dtype=np.uint8)
+
+    def leer(self, regiones, destino):
+        for registro in self._registros:
+            if registro[0] != "fotograma":
+                continue
+            _, instante, _, regiones_grabadas = registro
+            if self.ritmo_real:
+                ahora = time.monotonic()
+                if self._inicio is None:
+                    self._inicio = ahora - instante
+                espera = self._inicio + instante - ahora
+                if espera > 0:
+                    time.sleep(espera)
+            for (x, y, w, h), imagen in regiones_grabadas:
+                self._lienzo[y:y+h, x:x+w] = imagen
+            _copiar_regiones(self._lienzo, regiones, destino)
+            return True
+        return False
+
+def crear_fuente(origen=None, ritmo_real=True, fps=10.0, bucle=False):
+    """
+    Crea la fuente adecuada según `origen`:
+    None o "mss" = pantalla en vivo; .sesion = sesión grabada; directorio = secuencia de imágenes;
+    imagen (.png/.jpg/...) = imagen fija; cualquier otro archivo = vídeo.
+    """
+    if not origen or origen == "mss":
+        return FuenteMss()
+    if origen.lower().endswith(EXTENSION_SESION):
+        return FuenteSesion(origen, ritmo_real=ritmo_real)
+    if os.path.isdir(origen):
+        return FuenteDirectorio(origen, fps=fps, ritmo_real=ritmo_real, bucle=bucle)
+    if origen.lower().endswith(EXTENSIONES_IMAGEN):
+        return FuenteImagen(origen, fps=fps, ritmo_real=ritmo_real)
+    return FuenteVideo(origen, ritmo_real=ritmo_real, bucle=bucle)
@@ -0,0 +1,162 @@
+import json
+import queue
+import struct
+import threading
+import time
+import zlib
+import logging
+
+import numpy as np
+
+log = logging.getLogger("QA_Tool.grabadora")
+
+# Formato de archivo de sesión:
+#   MAGIA + cabecera JSON (longitud uint32) + registros.
+#   Cada registro: tipo (1 byte: F = fotograma, E = evento) + longitud (uint32) + datos.
+#   Fotograma: instante (double), secuencia (uint32), clase (1 byte: K = clave, D = delta),
+#   nº de regiones (uint16) y por región x, y, w, h (int32) + bytes zlib.
+#   Los deltas son el XOR con el fotograma anterior escrito, que comprime muy bien
+#   cuando la pantalla apenas cambia.
+MAGIA = b"QASES1\n"
+_CABECERA_FOTOGRAMA = struct.Struct("<dIcH")
+_CABECERA_REGION = struct.Struct("<iiiiI")
+_CABECERA_REGISTRO = struct.Struct("<cI")
+
+class GrabadoraSesion:
+    """
+    Graba fotogramas, detecciones y clics de una ejecución en un único archivo.
+    Todo el trabajo de compresión y escritura se hace en un hilo aparte: si hay demasiados
+    fotogramas pendientes se descartan en lugar de bloquear el bucle principal.
+    Los eventos (pequeños) nunca se descartan.
+    """
+    def __init__(self, ruta, ancho, alto, intervalo_clave=100, nivel_zlib=1, max_pendientes=16):
+        self.ruta = ruta
+        self.intervalo_clave = max(1, intervalo_clave)
+        self.nivel_zlib = nivel_zlib
+        self._cola = queue.Queue()
+        self._huecos = threading.Semaphore(max_pendientes) # Fotogramas en cola como máximo
+        self._inicio = time.monotonic()
+        self.fotogramas_grabados = 0
+        self.fotogramas_descartados = 0
+        self.eventos_grabados = 0
+        self.bytes_escritos = 0
+
+        self._archivo = open(ruta, "wb")
+        cabecera = json.dumps({"version": 1, "ancho": ancho, "alto": alto, "inicio": time.time()}).encode()
+        self._escribir(MAGIA + struct.pack("<I", len(cabecera)) + cabecera)
+
+        self._hilo = threading.Thread(target=self._bucle_escritura, name="GrabadoraSesion", daemon=True)
+        self._hilo.start()
+        log.info(f"Grabando sesión en {ruta}")
+
+    def grabar_fotograma(self, fotograma, secuencia, instante=None):
+        """Encola una copia del fotograma (sus buffers pueden reutilizarse al volver)."""
+        if not self._huecos.acquire(blocking=False):
+            self.fotogramas_descartados += 1
+            return
+        instante = (instante or time.monotonic()) - self._inicio
+        regiones = [(rect, imagen.copy()) for rect, imagen in fotograma.regiones]
+        self._cola.put(("F", instante, secuencia, regiones))
+
+    def grabar_evento(self, tipo, **datos):
+        """Encola un evento (p. ej. "deteccion" o "clic") con sus datos serializables a JSON."""
+        datos["tipo"] = tipo
+        datos["t"] = time.monotonic() - self._inicio
+        self._cola.put(("E", datos))
+
+    def cerrar(self):
+        """Vacía la cola y cierra el archivo."""
+        self._cola.put(None)
+        self._hilo.join()
+        self._archivo.close()
+        log.info(f"Sesión grabada: {self.fotogramas_grabados} fotogramas "
+                 f"({self.fotogramas_descartados} descartados), {self.eventos_grabados} eventos, "
+                 f"{self.bytes_escritos / 1e6:.1f} MB.")
+
+    def _escribir(self, datos):
+        self._archivo.write(datos)
+        self.bytes_escritos += len(datos)
+
+    def _bucle_escritura(self):
+        previo = None # Regiones del último fotograma escrito
+        desde_clave = 0
+        while True:
+            item = self._cola.get()
+            if item is None:
+                break
+            try:
+                if item[0] == "E":
+                    datos = json.dumps(item[1]).encode()
+                    self._escribir(_CABECERA_REGISTRO.pack(b"E", len(datos)) + datos)
+                    self.eventos_grabados += 1
+                    continue
+
+                _, instante, secuencia, regiones = item
+                mismo_formato = previo is not None and [r for r, _ in previo] == [r for r, _ in regiones]
+                es_clave = not mismo_formato or desde_clave >= self.intervalo_clave
+
+                partes = [_CABECERA_FOTOGRAMA.pack(instante, secuencia, b"K" if es_clave else b"D", len(regiones))]
+                for i, ((x, y, w, h), imagen) in enumerate(regiones):
+                    crudo = imagen if es_clave else np.bitwise_xor(imagen, previo[i][1])
+                    comprimido = zlib.compress(crudo.tobytes(), self.nivel_zlib)
+                    partes.append(_CABECERA_REGION.pack(x, y, w, h, len(comprimido)))
+                    partes.append(comprimido)
+                datos = b"".join(partes)
+                self._escribir(_CABECERA_REGISTRO.pack(b"F", len(datos)) + datos)
+
+                previo = regiones
+                desde_clave = 0 if es_clave else desde_clave + 1
+                self.fotogramas_grabados += 1
+            except Exception as e:
+                log.error(f"Error al grabar la sesión: {e}")
+            finally:
+                if item[0] == "F":
+                    self._huecos.release()
+
+class LectorSesion:
+    """Lee un archivo de sesión y reconstruye fotogramas (clave + deltas) y eventos en orden."""
+    def __init__(self, ruta):
+        self.ruta = ruta
+        with open(ruta, "rb") as f:
+            if f.read(len(MAGIA)) != MAGIA:
+                raise ValueError(f"{ruta} no es un archivo de sesión válido")
+            (longitud,) = struct.unpack("<I", f.read(4))
+            self.cabecera = json.loads(f.read(longitud))
+            self._inicio_registros = f.tell()
+        self.ancho = self.cabecera["ancho"]
+        self.alto = self.cabecera["alto"]
+
+    def __iter__(self):
+        """
+        Genera ("fotograma", instante, secuencia, [((x, y, w, h), imagen), ...]) y
+        ("evento", datos). Las imágenes de un fotograma se reutilizan como base del siguiente delta.
+        """
+        previo = None
+        with open(self.ruta, "rb") as f:
+            f.seek(self._inicio_registros)
+            while True:
+                cabecera = f.read(_CABECERA_REGISTRO.size)
+                if len(cabecera) < _CABECERA_REGISTRO.size:
+                    return
+                tipo, longitud = _CABECERA_REGISTRO.unpack(cabecera)
+                datos = f.read(longitud)
+                if len(datos) < longitud:
+                    log.warning(f"Sesión {self.ruta} truncada.")
+                    return
+                if tipo == b"E":
+                    yield ("evento", json.loads(datos))
+                    continue
+
+                instante, secuencia, clase, n_regiones = _CABECERA_FOTOGRAMA.unpack_from(datos)
+                pos = _CABECERA_FOTOGRAMA.size
+                regiones = []
+                for i in range(n_regiones):
+                    x, y, w, h, tam = _CABECERA_REGION.unpack_from(datos, pos)
+                    pos += _CABECERA_REGION.size
+                    imagen = np.frombuffer(zlib.decompress(datos[pos:pos+tam]), dtype=np.uint8).reshape(h, w, 3)
+                    pos += tam
+                    if clase == b"D":
+                        imagen = np.bitwise_xor(imagen, previo[i][1])
+                    regiones.append(((x, y, w, h), imagen))
+                previo = regiones
+                yield ("fotograma", instante, secuencia, regiones)
@@ -0,0 +1,192 @@
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+
+from app.logic.planificador import PlanificadorElementos
+from app.logic.simulacion import SimulationManager, RUTA_TIMERS
+from app.logic.escalado import plantilla_escalada
+
+log = logging.getLogger("QA_Tool.instancias")
+
+ZONA_VENTANA = "RegionVentana" # Zona del perfil con el rectángulo de la ventana calibrada
+SUFIJO_ZONA_BUSQUEDA = "_ZonaBusqueda" # "<elemento>_ZonaBusqueda": zona donde se busca ese elemento
+
+def parsear_instancia(texto):
+    """
+    Convierte "[nombre=]perfil.json[@x,y,w,h]" en una definición de
+    config_ejecucion["instancias"]. Así varias ventanas pueden compartir perfil
+    con nombre y región propios.
+
+    :raises ValueError: Si falta el perfil o la región no son cuatro enteros (w y h > 0).
+    """
+    nombre, separador, resto = texto.strip().partition("=")
+    if not separador:
+        nombre, resto = "", nombre
+    perfil, _, region = resto.partition("@")
+    definicion = {"perfil": perfil.strip()}
+    if not definicion["perfil"]:
+        raise ValueError(f"Falta el perfil en la instancia '{texto}'")
+    if nombre.strip():
+        definicion["nombre"] = nombre.strip()
+    if region.strip():
+        try:
+            valores = [int(v) for v in region.split(",")]
+        except ValueError:
+            valores = []
+        if len(valores) != 4 or valores[2] <= 0 or valores[3] <= 0:
+            raise ValueError(f"Región no válida en la instancia '{texto}' (use x,y,w,h)")
+        definicion["region"] = valores
+    return definicion
+
+class Instancia:
+    """
+    Una ventana de juego/emulador dentro de la pantalla compartida.
+
+    Cada instancia tiene su perfil de calibración, su planificador y sus timers;
+    la captura, la caché de plantillas y el MatchEngine son comunes a todas.
+    Si se indica `region` (x, y, w, h en pantalla), las zonas del perfil se
+    trasladan a esa ventana: relativas a la zona 'RegionVentana' del perfil si
+    existe, o al origen de la ventana si no. Así un mismo perfil sirve para
+    varias ventanas idénticas.
+
+    Con un perfil normalizado (`referencia` = resolución calibrada) las zonas y
+    las plantillas además se escalan: de la referencia a `resolucion` (la de la
+    captura), o de 'RegionVentana' al tamaño de `region`.
+
+    Sin `persistir_timers` (dry-run, grabaciones) los timers solo viven en memoria.
+    """
+    def __init__(self, nombre, zonas_calibradas, config_elementos, region=None, referencia=None, resolucion=None,
+                 persistir_timers=True):
+        self.nombre = nombre
+        self.config_elementos = config_elementos
+        self.region = tuple(region) if region else None
+
+        ventana = zonas_calibradas.get(ZONA_VENTANA)
+        # Rectángulo del perfil (base) que se lleva a un rectángulo de pantalla (destino)
+        if self.region is not None:
+            base = tuple(ventana) if ventana else (0, 0) + tuple(referencia or self.region[2:])
+            destino = self.region
+        else:
+            base = (0, 0) + tuple(referencia or resolucion or (1, 1))
+            destino = (0, 0) + tuple(resolucion or referencia or (1, 1))
+        if referencia is None:
+            destino = destino[:2] + base[2:] # Perfil en píxeles absolutos: solo se traslada
+        self._base = base
+        self._destino = destino
+        self.escala = (destino[2] / base[2], destino[3] / base[3])
+        if self.escala != (1.0, 1.0):
+            log.info(f"Instancia '{nombre}': perfil calibrado a {base[2]}x{base[3]}, escalado a {destino[2]}x{destino[3]}")
+        self.zonas = {nombre_zona: self.trasladar(rect) for nombre_zona, rect in zonas_calibradas.items()}
+        if self.region is None and ventana:
+            self.region = self.zonas[ZONA_VENTANA]
+
+        ruta_timers = RUTA_TIMERS if persistir_timers else None
+        if nombre and persistir_timers:
+            base, extension = os.path.splitext(RUTA_TIMERS)
+            ruta_timers = f"{base}_{nombre}{extension}"
+        self.sim_manager = SimulationManager(config_elementos, ruta_estado=ruta_timers)
+        self.planificador = None
+        self.no_antes_de = 0.0 # Tras un clic en esta ventana, solo valen fotogramas posteriores
+        self.acciones_pendientes = 0 # Acciones de entrada enviadas y aún sin terminar
+
+    def trasladar(self, rect):
+        """Pasa un rectángulo del perfil a coordenadas de pantalla."""
+        bx, by = self._base[:2]
+        dx, dy = self._destino[:2]
+        escala_x, escala_y = self.escala
+        x, y, w, h = rect
+        return (round(dx + (x - bx) * escala_x), round(dy + (y - by) * escala_y),
+                max(1, round(w * escala_x)), max(1, round(h * escala_y)))
+
+    def ruta_plantilla(self, ruta):
+        """Plantilla a usar en esta instancia: la original o su versión reescalada (cacheada en disco)."""
+        if self.escala == (1.0, 1.0):
+            return ruta
+        return plantilla_escalada(ruta, self._base[2:], self._destino[2:])
+
+    def clave(self, nombre_elem):
+        """Nombre único del elemento en el MatchEngine compartido."""
+        return f"{self.nombre}/{nombre_elem}" if self.nombre else nombre_elem
+
+    def construir_especificaciones(self):
+        """Combina la configuración de elementos con las zonas del perfil para el MatchEngine."""
+        especificaciones = {}
+        for nombre_elem, config in self.config_elementos.items():
+            # Intenta buscar una zona específica, si no, busca en toda la ventana (o la pantalla)
+            zona_busqueda_nombre = f"{nombre_elem}{SUFIJO_ZONA_BUSQUEDA}"
+            rect_busqueda = self.zonas.get(zona_busqueda_nombre)
+            if rect_busqueda:
+                log.debug(f"'{self.clave(nombre_elem)}' se buscará en zona calibrada: {zona_busqueda_nombre}")
+            else:
+                rect_busqueda = self.region
+
+            especificaciones[self.clave(nombre_elem)] = {
+                "path_template": self.ruta_plantilla(config["path_template"]),
+                "zona": rect_busqueda,
+                "threshold": config.get("threshold", 0.70),
+                "niveles_piramide": config.get("niveles_piramide", 0),
+                "ventana_refinado": config.get("ventana_refinado", 8),
+                # Si el elemento solo clica un objetivo, basta con la mejor coincidencia.
+                # En modo cosecha se necesitan todas para clicarlas en una sola tanda.
+                "modo": "mejor" if config.get("objetivo_unico", True) and not config.get("cosecha") else "todas",
+                "cosecha": config.get("cosecha", False),
+                # En cosecha cada coincidencia es un clic: dos cajas solapadas son el mismo objeto
+                "iou_max": config.get("iou_max", 0.0 if config.get("cosecha") else 0.3),
+                "umbral_seguro": config.get("umbral_seguro", 0.95),
+            }
+        return especificaciones
+
+    def construir_planificador(self):
+        """Crea el planificador con la cadencia, prioridad, backoff y enfriamiento de cada elemento."""
+        planificador = PlanificadorElementos()
+        ahora = time.monotonic()
+        for nombre_elem, config in self.config_elementos.items():
+            planificador.agregar(
+                nombre_elem,
+                intervalo=config.get("intervalo_escaneo", 1.0),
+                prioridad=config.get("prioridad", 0),
+                backoff=config.get("backoff", 1.5),
+                intervalo_max=config.get("intervalo_max", 8.0),
+                enfriamiento=config.get("enfriamiento", 2.0),
+                instante=ahora,
+            )
+            # Elementos con timer de reaparición pendiente (de esta u otra sesión): no buscarlos aún
+            restante = self.sim_manager.restante(nombre_elem)
+            if restante > 0:
+                log.info(f"'{self.clave(nombre_elem)}' en reaparición, no se buscará hasta dentro de {restante:.0f}s")
+                planificador.posponer(nombre_elem, ahora + restante)
+        self.planificador = planificador
+        return planificador
+
+class ColaEntrada:
+    """
+    Cola única de acciones de entrada con reparto round-robin entre instancias.
+
+    Solo hay un ratón: las acciones se ejecutan de una en una, tomando cada vez
+    de la siguiente instancia con acciones pendientes, para que ninguna ventana
+    acapare la entrada.
+    """
+    def __init__(self):
+        self._colas = OrderedDict() # instancia -> deque de acciones
+        self._turno = deque()
+
+    def encolar(self, instancia, accion):
+        if instancia not in self._colas:
+            self._colas[instancia] = deque()
+            self._turno.append(instancia)
+        self._colas[instancia].append(accion)
+
+    def siguiente(self):
+        """
+        :return: (instancia, accion) del siguiente turno, o None si la cola está vacía.
+        """
+        for _ in range(len(self._turno)):
+            instancia = self._turno[0]
+            self._turno.rotate(-1) # El turno pasa a la siguiente instancia, haya acción o no
+            if self._colas[instancia]:
+                return instancia, self._colas[instancia].popleft()
+        return None
+
+    def __len__(self):
+        return sum(len(cola) for cola in self._colas.values())
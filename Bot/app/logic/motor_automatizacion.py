@@ -0,0 +1,500 @@
+import asyncio
+import functools
+import os
+import time
+import random
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from app.logic.vision import template_store
+from app.logic.motor_vision import MatchEngine
+from app.logic.captura import planificar_regiones, HiloCaptura
+from app.logic.fuentes import crear_fuente
+from app.logic.grabadora import GrabadoraSesion
+from app.logic.instancias import Instancia, ColaEntrada
+from app.logic.verificacion import VerificadorAcciones
+from app.logic.cosecha import ordenar_recorrido
+from app.logic.controles import (punto_en_rect, FailSafeActivado, AccionClic, AccionMantener, AccionSecuencia,
+                                 EjecutorEntrada, BackendPydirectinput, BackendRegistro)
+from app.utils.config import cargar_perfil, zonas_de_perfil
+
+log = logging.getLogger("QA_Tool.motor_automatizacion")
+
+def _sin_accion(*args):
+    pass
+
+class MotorAutomatizacion:
+    """
+    Lógica de automatización sin dependencias de Qt.
+
+    El progreso se notifica con callbacks opcionales (estado, tiempo restante,
+    log, contadores y fin), así que sirve tanto para el AutomationWorker de la
+    GUI (que los conecta a sus señales) como para el modo sin interfaz (cli.py).
+
+    El bucle es una corrutina de asyncio: las esperas y las etapas bloqueantes
+    (fotograma, análisis, clic) son cancelables, así que detener() surte efecto
+    en el acto. Los callbacks se llaman desde el hilo que ejecuta el motor.
+    """
+    def __init__(self, config_ejecucion, config_elementos, perfil_calibracion,
+                 al_estado=None, al_tiempo=None, al_log=None, al_contador=None, al_finalizar=None):
+        self.config_ejecucion = config_ejecucion
+        self.config_elementos = config_elementos
+        self.perfil_calibracion_nombre = perfil_calibracion
+        
+        self.zonas_calibradas = {}
+        
+        self._esta_corriendo = False
+        self._loop = None # Bucle de eventos y tarea del motor (para detener() desde otros hilos)
+        self._tarea = None
+        self.entrada = None
+        self.hilo_captura = None
+        self._ultimos_resultados = {} # Coincidencias del último análisis (para la vista previa)
+        self.modo_dry_run = config_ejecucion.get("dry_run", False)
+
+        self.al_estado = al_estado or _sin_accion # (str)
+        self.al_tiempo = al_tiempo or _sin_accion # (str) 'HH:MM:SS'
+        self.al_log = al_log or _sin_accion # (str)
+        self.al_contador = al_contador or _sin_accion # (nombre_contador, valor)
+        self.al_finalizar = al_finalizar or _sin_accion
+        
+        self.contadores = {"clics": 0, "elementos_encontrados": 0, "errores": 0, "reintentos": 0,
+                           "busquedas_omitidas": 0}
+
+    @property
+    def corriendo(self):
+        return self._esta_corriendo
+
+    def ejecutar(self):
+        """Bucle principal. Bloquea hasta que se agota el tiempo o se llama a detener()."""
+        asyncio.run(self.ejecutar_async())
+
+    async def ejecutar_async(self):
+        """
+        Bucle principal como corrutina: captura, análisis y clics son etapas que se
+        esperan en un ejecutor, y detener() cancela la tarea en el acto, esté donde esté.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._tarea = asyncio.current_task()
+        self._esta_corriendo = True
+
+        # Fuente de fotogramas: pantalla en vivo (mss) o una grabación (imagen, directorio, vídeo)
+        try:
+            fuente = crear_fuente(self.config_ejecucion.get("fuente"), ritmo_real=self.config_ejecucion.get("ritmo_real", True))
+            ancho, alto = fuente.geometria()
+        except (OSError, ValueError) as e:
+            msg = f"Error: No se pudo abrir la fuente de fotogramas: {e}"
+            log.critical(msg)
+            self.al_log(msg)
+            self._esta_corriendo = False
+            self.al_finalizar()
+            return
+
+        # Cargar perfiles: una instancia por ventana, todas sobre la misma captura
+        # (los perfiles normalizados se escalan a la resolución de la captura)
+        self.instancias = self.cargar_instancias((ancho, alto))
+        if not self.instancias:
+            self._esta_corriendo = False
+            self.al_finalizar()
+            return
+        self.zonas_calibradas = self.instancias[0].zonas
+
+        self.especificaciones = {}
+        for instancia in self.instancias:
+            self.especificaciones.update(instancia.construir_especificaciones())
+            instancia.construir_planificador()
+        self.motor = MatchEngine(escala_grises=self.config_ejecucion.get("escala_grises", False),
+                                 tolerancia_cambios=self.config_ejecucion.get("tolerancia_cambios", 6),
+                                 margenes_seguimiento=self.config_ejecucion.get("margenes_seguimiento", (16, 64)),
+                                 backend=self.config_ejecucion.get("backend_vision", "hilos"),
+                                 rutas_plantillas=sorted({spec["path_template"] for spec in self.especificaciones.values()}))
+
+        duracion_total_seg = self.config_ejecucion.get("duracion_seg", 600)
+        tiempo_fin = time.time() + duracion_total_seg
+        
+        self.al_log(f"Iniciando prueba. Duración: {duracion_total_seg}s. Dry-Run: {self.modo_dry_run}")
+        
+        # Capturar solo lo necesario: las zonas de búsqueda (fusionadas) de todas las instancias
+        zonas = [spec["zona"] for spec in self.especificaciones.values()]
+        regiones = planificar_regiones(zonas, ancho, alto)
+        log.info(f"Plan de captura ({fuente.nombre}): {len(regiones)} regiones {regiones}")
+
+        # Modo grabación: fotogramas, detecciones y clics a un archivo de sesión
+        self.grabadora = None
+        ruta_grabacion = self.config_ejecucion.get("grabar_sesion")
+        if ruta_grabacion:
+            self.grabadora = GrabadoraSesion(ruta_grabacion, ancho, alto)
+            self.al_log(f"Grabando sesión en {ruta_grabacion}")
+
+        # La captura corre en su propio hilo y se solapa con el análisis
+        # (un buffer más en el anillo para que la vista previa no robe el del análisis).
+        # Con grabación, cada fotograma capturado se graba desde ese hilo, se analice o no
+        self.hilo_captura = HiloCaptura(fuente, regiones, tam_anillo=4, fps_max=self.config_ejecucion.get("fps_captura", 20),
+                                        al_publicar=self.grabadora.grabar_fotograma if self.grabadora else None)
+        self.hilo_captura.start()
+
+        # La entrada va en su propio hilo: clics y pulsaciones largas no frenan la detección
+        self.entrada = EjecutorEntrada(BackendRegistro() if self.modo_dry_run else BackendPydirectinput())
+        self.entrada.start()
+        self.asentamiento_seg = self.config_ejecucion.get("asentamiento_seg", 0.3)
+        # Verificación tras cada acción, con timeouts aprendidos por elemento
+        self.verificador = VerificadorAcciones()
+        self._verificaciones = set()
+        # Se activa cuando algo reprograma trabajo (p. ej. una verificación fallida): despierta la espera del bucle
+        self._despertar = asyncio.Event()
+        self._ultimo_punto = None # Última posición enviada al puntero (origen del recorrido de cosecha)
+
+        # Etapas bloqueantes (esperar fotograma, analizar) fuera del bucle de eventos
+        # (una espera de fotograma por verificación en curso, como mucho una por instancia)
+        self._ejecutor = ThreadPoolExecutor(max_workers=2 + len(self.instancias), thread_name_prefix="MotorAutomatizacion")
+        reloj = asyncio.create_task(self._reloj(tiempo_fin))
+        try:
+            async with asyncio.timeout(duracion_total_seg):
+                await self._bucle()
+        except TimeoutError:
+            pass # Tiempo agotado
+        except asyncio.CancelledError:
+            if self._esta_corriendo:
+                raise # Cancelación ajena a detener()
+        finally:
+            reloj.cancel()
+            self.entrada.detener()
+            # Sin esperar: si una etapa sigue en su hilo (p. ej. adquirir), termina sola
+            self._ejecutor.shutdown(wait=False, cancel_futures=True)
+            self.hilo_captura.detener()
+            self.hilo_captura.join(timeout=2.0)
+            if self.grabadora:
+                self.grabadora.cerrar()
+            self.motor.cerrar()
+
+        msg = "Prueba finalizada (tiempo agotado o detenida)."
+        log.info(msg)
+        log.info(f"Caché de plantillas: {template_store.estadisticas()}")
+        log.info(f"Búsquedas: {self.motor.estadisticas()}")
+        log.info(f"Verificación de acciones: {self.verificador.estadisticas()}")
+        self.al_log(msg)
+        self.detener()
+
+    async def _en_hilo(self, funcion, *args, **kwargs):
+        """Ejecuta una etapa bloqueante en el ejecutor del motor y la espera."""
+        return await self._loop.run_in_executor(self._ejecutor, functools.partial(funcion, *args, **kwargs))
+
+    async def _reloj(self, tiempo_fin):
+        """Notifica el tiempo restante una vez por segundo, en paralelo con las etapas del bucle."""
+        while True:
+            tiempo_restante = max(tiempo_fin - time.time(), 0)
+            self.al_tiempo(time.strftime('%H:%M:%S', time.gmtime(tiempo_restante)))
+            await asyncio.sleep(1.0)
+
+    async def _bucle(self):
+        ultima_secuencia = 0
+        # Un solo ratón: los clics de todas las instancias pasan por una cola round-robin
+        cola_entrada = ColaEntrada()
+
+        while self._esta_corriendo:
+            try:
+                # 1. Dormir solo hasta la siguiente comprobación pendiente (de cualquier instancia)
+                ahora = time.monotonic()
+                vencidos = {}
+                for instancia in self.instancias:
+                    for nombre_elem in instancia.sim_manager.verificar_timers():
+                        if instancia.planificador.estado(nombre_elem) is not None:
+                            instancia.planificador.posponer(nombre_elem, ahora) # Ya puede haber reaparecido
+                    pendientes = instancia.planificador.vencidos(ahora)
+                    if pendientes:
+                        vencidos[instancia] = pendientes
+                if not vencidos:
+                    proximos = [p for p in (inst.planificador.proximo_vencimiento() for inst in self.instancias) if p is not None]
+                    self._despertar.clear()
+                    try:
+                        await asyncio.wait_for(self._despertar.wait(), max(min(proximos) - ahora, 0.0) if proximos else 1.0)
+                    except TimeoutError:
+                        pass
+                    continue
+
+                # 2. Tomar el fotograma más reciente del hilo de captura
+                cuadro = await self._en_hilo(self.hilo_captura.adquirir, ultima_secuencia, timeout=1.0)
+                if cuadro is None:
+                    for instancia, pendientes in vencidos.items():
+                        for nombre_elem in pendientes:
+                            instancia.planificador.posponer(nombre_elem, ahora)
+                    if self.hilo_captura.agotada:
+                        self.al_log("La fuente de fotogramas se agotó.")
+                        break
+                    log.debug("Sin fotogramas nuevos del hilo de captura.")
+                    continue
+                ultima_secuencia = cuadro.secuencia
+
+                # Ventanas con una acción en curso o reciente: el fotograma es anterior a que su UI reaccionara
+                for instancia in [inst for inst in vencidos if inst.acciones_pendientes or cuadro.instante < inst.no_antes_de]:
+                    reintento = instancia.no_antes_de
+                    if instancia.acciones_pendientes:
+                        reintento = max(reintento, time.monotonic() + self.asentamiento_seg)
+                    for nombre_elem in vencidos.pop(instancia):
+                        instancia.planificador.posponer(nombre_elem, reintento)
+                if not vencidos:
+                    cuadro.liberar()
+                    continue
+
+                # 3. Buscar los elementos vencidos de todas las instancias en el mismo fotograma (una sola pasada)
+                total = sum(len(pendientes) for pendientes in vencidos.values())
+                self.al_estado(f"Buscando {total} elementos...")
+                claves = [inst.clave(n) for inst, pendientes in vencidos.items() for n in pendientes]
+                resultados, firmas = await self._en_hilo(self._analizar, cuadro, claves)
+                if self.grabadora:
+                    self.grabadora.grabar_evento("deteccion", secuencia=cuadro.secuencia, resultados=resultados)
+                if self.motor.busquedas_omitidas != self.contadores["busquedas_omitidas"]:
+                    # Zonas sin cambios desde el último análisis: se reutilizó la detección
+                    self.contadores["busquedas_omitidas"] = self.motor.busquedas_omitidas
+                    self.al_contador("busquedas_omitidas", self.contadores["busquedas_omitidas"])
+
+                # 4. Lógica de automatización: cada instancia propone su clic más prioritario
+                for instancia, pendientes in vencidos.items():
+                    for indice, nombre_elem in enumerate(pendientes):
+                        # Las coincidencias ya vienen en coordenadas de pantalla
+                        coincidencias = resultados.get(instancia.clave(nombre_elem), [])
+                        
+                        if coincidencias:
+                            msg = f"'{instancia.clave(nombre_elem)}' encontrado en {len(coincidencias)} ubicaciones."
+                            log.info(msg)
+                            self.al_log(msg)
+                            self.contadores["elementos_encontrados"] += 1
+                            self.al_contador("elementos_encontrados", self.contadores["elementos_encontrados"])
+                            # Modo cosecha: todas las coincidencias (sin solapes) de una vez; si no, la mejor
+                            config = instancia.config_elementos[nombre_elem]
+                            objetivos = coincidencias[:config.get("max_cosecha", 30)] if config.get("cosecha") else coincidencias[:1]
+                            # El resto de la tanda se revisa tras el clic, con un fotograma posterior
+                            cola_entrada.encolar(instancia, (nombre_elem, objetivos, pendientes[indice + 1:]))
+                            break
+                        else:
+                            log.debug(f"'{instancia.clave(nombre_elem)}' no encontrado.")
+                            # Aquí iría la lógica de reintento (ej: buscar botón "cambiar pantalla")
+                            instancia.planificador.registrar_resultado(nombre_elem, False, time.monotonic())
+
+                # 5. Enviar los clics al hilo de entrada por turnos entre instancias (sin esperar a que terminen)
+                while self._esta_corriendo:
+                    siguiente = cola_entrada.siguiente()
+                    if siguiente is None:
+                        break
+                    instancia, (nombre_elem, objetivos, resto) = siguiente
+                    firmas_objetivos = firmas.get(instancia.clave(nombre_elem), [])[:len(objetivos)]
+                    self.ejecutar_clics(instancia, nombre_elem, objetivos, firmas_objetivos)
+
+                    # El clic cambia la ventana: el resto de resultados de este fotograma ya no valen.
+                    # Se vuelven a comprobar con un fotograma posterior a la acción y al asentamiento de la UI.
+                    reintento = time.monotonic() + self.asentamiento_seg
+                    for pendiente in resto:
+                        instancia.planificador.posponer(pendiente, reintento)
+
+                # 6. Lógica de "Reparación" / Backoff
+                # (Ejemplo de cómo usar una zona calibrada fija)
+                if "BotonReparar" in self.zonas_calibradas:
+                    # (Aquí iría la lógica de cuándo reparara)
+                    # ej: if self.contadores["errores"] > 5:
+                    pass
+                    
+            except Exception as e:
+                msg = f"Error crítico en el bucle: {e}"
+                log.error(msg, exc_info=True)
+                self.al_log(msg)
+                self.contadores["errores"] += 1
+                self.al_contador("errores", self.contadores["errores"])
+                # Descartar clics pendientes y reprogramar lo que quedó sin resultado antes de reintentar
+                while cola_entrada.siguiente() is not None:
+                    pass
+                for instancia in self.instancias:
+                    for nombre_elem in instancia.config_elementos:
+                        estado = instancia.planificador.estado(nombre_elem)
+                        if estado is not None and estado.proximo <= time.monotonic():
+                            instancia.planificador.posponer(nombre_elem, time.monotonic())
+                await asyncio.sleep(random.uniform(5.0, 10.0))
+
+    def _analizar(self, cuadro, claves):
+        """
+        Etapa de análisis (en el ejecutor): busca los elementos indicados.
+        :return: (resultados, { clave: [firmas de las zonas a clicar] }) para verificar los clics.
+        """
+        with cuadro: # Devuelve el buffer al anillo al terminar el análisis
+            resultados = self.motor.match_all(cuadro.fotograma, {c: self.especificaciones[c] for c in claves})
+            self._ultimos_resultados = {**self._ultimos_resultados, **resultados}
+            firmas = {}
+            for clave, coincidencias in resultados.items():
+                # Solo las zonas que se van a clicar: la mejor, o todas en modo cosecha
+                objetivos = coincidencias if self.especificaciones[clave].get("cosecha") else coincidencias[:1]
+                recortes = [cuadro.fotograma.recortar(c[:4]) for c in objetivos]
+                if recortes and all(r is not None for r in recortes):
+                    firmas[clave] = [self.verificador.firma(r[0]) for r in recortes]
+            return resultados, firmas
+
+    def vista_previa(self, secuencia_previa=0):
+        """
+        Último fotograma capturado con las zonas de búsqueda y las últimas coincidencias.
+        No bloquea ni consume el fotograma del bucle: se puede llamar desde la GUI.
+
+        :return: (cuadro, { clave: zona }, { clave: [coincidencias] }) o None si no hay uno más nuevo.
+                 El cuadro hay que liberarlo (o usarlo con `with`) en cuanto se dibuje.
+        """
+        hilo_captura = self.hilo_captura
+        if hilo_captura is None or not self._esta_corriendo:
+            return None
+        cuadro = hilo_captura.observar(secuencia_previa)
+        if cuadro is None:
+            return None
+        zonas = {clave: spec["zona"] for clave, spec in self.especificaciones.items()}
+        return cuadro, zonas, self._ultimos_resultados
+
+    def cargar_instancias(self, resolucion=None):
+        """
+        Crea una Instancia por ventana a partir de config_ejecucion["instancias"]
+        (lista de {"nombre", "perfil", "region"}); sin ella, una sola instancia
+        con el perfil seleccionado y las zonas tal cual. Los nombres deben ser únicos.
+        :param resolucion: (ancho, alto) de la captura, para escalar los perfiles normalizados.
+        :return: Lista de instancias, o None si algún perfil no se pudo cargar o hay nombres repetidos.
+        """
+        definiciones = self.config_ejecucion.get("instancias") or [{"nombre": "", "perfil": self.perfil_calibracion_nombre}]
+        # Nombre por defecto = perfil; si varias ventanas comparten perfil se numeran (claves y timers propios)
+        bases = [os.path.splitext(d["perfil"])[0] for d in definiciones]
+        nombres = []
+        for i, (definicion, base) in enumerate(zip(definiciones, bases)):
+            if len(definiciones) == 1:
+                defecto = ""
+            else:
+                defecto = base if bases.count(base) == 1 else f"{base}_{i + 1}"
+            nombres.append(definicion.get("nombre", defecto))
+        repetidos = sorted({n for n in nombres if nombres.count(n) > 1})
+        if repetidos:
+            msg = f"Error: Nombres de instancia repetidos: {', '.join(repetidos)}"
+            log.critical(msg)
+            self.al_log(msg)
+            return None
+        # Los timers solo se guardan en disco en ejecuciones reales sobre la pantalla en vivo:
+        # un dry-run o una grabación no deben dejar elementos "recogidos" para la siguiente ejecución
+        persistir_timers = not self.modo_dry_run and self.config_ejecucion.get("fuente") in (None, "", "mss")
+        instancias = []
+        for definicion, nombre in zip(definiciones, nombres):
+            perfil = cargar_perfil(definicion["perfil"])
+            if not perfil:
+                msg = f"Error: No se pudo cargar el perfil {definicion['perfil']}"
+                log.critical(msg)
+                self.al_log(msg)
+                return None
+            zonas, referencia = zonas_de_perfil(perfil)
+            instancias.append(Instancia(nombre, zonas, self.config_elementos, region=definicion.get("region"),
+                                        referencia=referencia, resolucion=resolucion, persistir_timers=persistir_timers))
+            self.al_log(f"Perfil {definicion['perfil']} cargado." + (f" (instancia '{nombre}')" if nombre else ""))
+        return instancias
+
+    def ejecutar_clics(self, instancia, nombre_elem, objetivos, firmas_referencia=None):
+        """
+        Envía al hilo de entrada los clics (o pulsaciones largas, si el elemento tiene
+        'duracion_press') sobre las coincidencias elegidas y reprograma su comprobación.
+        Varias coincidencias (modo cosecha) van en una sola secuencia, ordenadas por el
+        recorrido más corto del puntero. No bloquea: la espera y la verificación del
+        resultado corren en su propia tarea.
+        :param objetivos: Coincidencias (x, y, w, h, puntuacion) a clicar.
+        :param firmas_referencia: Firmas de esas zonas antes del clic (ver VerificadorAcciones).
+        """
+        config = instancia.config_elementos[nombre_elem]
+        rects = [(x, y, w, h) for (x, y, w, h, _) in objetivos]
+        log.debug(f"Coincidencias a clicar de '{instancia.clave(nombre_elem)}': {[round(c[4], 3) for c in objetivos]}")
+        
+        puntos = [punto_en_rect(rect) for rect in rects]
+        orden = ordenar_recorrido(puntos, self._ultimo_punto) if len(puntos) > 1 else [0]
+        duracion_press = config.get("duracion_press")
+        acciones = [AccionMantener(*puntos[i], duracion_press) if duracion_press else AccionClic(*puntos[i]) for i in orden]
+        accion = acciones[0] if len(acciones) == 1 else AccionSecuencia(acciones, pausa=config.get("pausa_cosecha", 0.05))
+        futuro = self.entrada.enviar(accion, prioridad=config.get("prioridad", 0))
+        self._ultimo_punto = puntos[orden[-1]]
+        # Hasta que termine y se verifique, la ventana de esta instancia no se analiza
+        instancia.acciones_pendientes += 1
+        tarea = asyncio.create_task(self._verificar_accion(instancia, nombre_elem, rects, firmas_referencia, futuro))
+        self._verificaciones.add(tarea)
+        tarea.add_done_callback(self._verificaciones.discard)
+
+        for i in orden:
+            if self.grabadora:
+                self.grabadora.grabar_evento("clic", elemento=instancia.clave(nombre_elem), rect=rects[i], punto=puntos[i])
+        self.contadores["clics"] += len(puntos)
+        self.al_contador("clics", self.contadores["clics"])
+        instancia.planificador.registrar_resultado(nombre_elem, True, time.monotonic())
+        if instancia.sim_manager.iniciar_timer(nombre_elem) is not None:
+            # Recogido: no puede volver a existir hasta que venza su timer
+            instancia.planificador.posponer(nombre_elem, time.monotonic() + instancia.sim_manager.restante(nombre_elem))
+
+    async def _verificar_accion(self, instancia, nombre_elem, rects, firmas_referencia, futuro):
+        """
+        Espera a que termine la acción y comprueba en cada fotograma nuevo si las zonas clicadas
+        cambiaron. En cuanto cambian todas, la instancia vuelve a analizarse (sin asentamiento fijo).
+        Si alguna no cambia antes del timeout aprendido, ese clic no surtió efecto: se revisa el elemento ya.
+        """
+        clave = instancia.clave(nombre_elem)
+        no_antes_de = None
+        try:
+            await asyncio.wait([asyncio.wrap_future(futuro)])
+            if futuro.cancelled() or futuro.exception() is not None:
+                if not futuro.cancelled() and isinstance(futuro.exception(), FailSafeActivado):
+                    self.detener_emergencia()
+                return
+            fin_accion = futuro.result()
+
+            if (not firmas_referencia or len(firmas_referencia) != len(rects) or self.modo_dry_run
+                    or not self.config_ejecucion.get("verificar_acciones", True)):
+                # Sin verificación posible: asentamiento fijo
+                no_antes_de = time.monotonic() + self.asentamiento_seg
+                return
+
+            sin_cambio = set(range(len(rects)))
+            limite = fin_accion + self.verificador.timeout(clave)
+            secuencia = 0
+            while time.monotonic() < limite:
+                cuadro = await self._en_hilo(self.hilo_captura.adquirir, secuencia, timeout=max(limite - time.monotonic(), 0.01))
+                if cuadro is None:
+                    continue
+                with cuadro:
+                    secuencia = cuadro.secuencia
+                    if cuadro.instante < fin_accion:
+                        continue # Capturado antes de que terminara la acción
+                    for i in list(sin_cambio):
+                        recorte = cuadro.fotograma.recortar(rects[i])
+                        if recorte is None or self.verificador.cambio(firmas_referencia[i], recorte[0]):
+                            sin_cambio.discard(i)
+                if not sin_cambio:
+                    self.verificador.registrar_cambio(clave, cuadro.instante - fin_accion)
+                    return
+
+            # La pantalla no reaccionó (en todas las zonas): algún clic se perdió y el elemento sigue ahí
+            self.verificador.registrar_sin_cambio(clave)
+            self.contadores["reintentos"] += 1
+            self.al_contador("reintentos", self.contadores["reintentos"])
+            instancia.sim_manager.cancelar_timer(nombre_elem)
+            instancia.planificador.posponer(nombre_elem, time.monotonic())
+        finally:
+            # Tras el clic la zona ya no es la analizada: el próximo análisis no puede reutilizar el resultado
+            self.motor.invalidar(clave)
+            instancia.acciones_pendientes -= 1
+            instancia.no_antes_de = no_antes_de if no_antes_de is not None else time.monotonic()
+            self._despertar.set() # Puede haber reprogramado el elemento o liberado la instancia
+
+    def detener(self):
+        """Detiene el motor al instante. Se puede llamar desde cualquier hilo (GUI, hotkey, señal)."""
+        if self._esta_corriendo:
+            self._esta_corriendo = False
+            if self._loop is not None:
+                try:
+                    self._loop.call_soon_threadsafe(self._cancelar)
+                except RuntimeError:
+                    pass # El bucle de eventos ya terminó
+            self.al_finalizar()
+
+    def _cancelar(self):
+        if self._tarea is not None and not self._tarea.done() and self._tarea is not asyncio.current_task():
+            self._tarea.cancel()
+
+    def detener_emergencia(self):
+        if self._esta_corriendo:
+            msg = "¡DETENCIÓN DE EMERGENCIA (HOTKEY) ACTIVADA!"
+            log.critical(msg)
+            self.al_log(msg)
+            self.al_estado("DETENIDO (PÁNICO)")
+            if self.entrada is not None:
+                self.entrada.panico() # Descartar acciones en cola y cortar la que esté en curso
+            self.detener()
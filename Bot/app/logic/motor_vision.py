@@ -0,0 +1,217 @@
+import cv2
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from app.logic.vision import find_template, find_best, construir_piramide, template_store
+from app.logic.cambios import DetectorCambios
+from app.logic.seguimiento import SeguidorElemento
+from app.logic.captura import Fotograma
+
+log = logging.getLogger("QA_Tool.motor_vision")
+
+def buscar_segun_modo(imagen, plantilla, spec, piramide=None):
+    """Ejecuta la búsqueda de un elemento según su modo. Siempre devuelve una lista."""
+    parametros = {
+        "threshold": spec.get("threshold", 0.70),
+        "niveles_piramide": spec.get("niveles_piramide", 0),
+        "ventana_refinado": spec.get("ventana_refinado", 8),
+        "piramide": piramide,
+    }
+    if spec.get("modo") == "mejor":
+        # Camino rápido: solo la mejor coincidencia, sin extraer candidatos
+        mejor = find_best(imagen, plantilla, umbral_seguro=spec.get("umbral_seguro"), **parametros)
+        return [mejor] if mejor else []
+    return find_template(imagen, plantilla, iou_max=spec.get("iou_max", 0.3), **parametros)
+
+def buscar_con_ventanas(imagen, plantilla, spec, piramide=None, ventanas=()):
+    """
+    Busca primero en las ventanas de seguimiento y, si no acierta, en la imagen completa.
+
+    :param ventanas: Rectángulos (x, y, w, h) relativos a `imagen`, de más pequeño a más grande.
+    :return: (coincidencias relativas a `imagen`, True si se encontró dentro de una ventana).
+    """
+    if ventanas:
+        spec_ventana = dict(spec, niveles_piramide=0)
+        for vx, vy, vw, vh in ventanas:
+            coincidencias = buscar_segun_modo(imagen[vy:vy + vh, vx:vx + vw], plantilla, spec_ventana)
+            if coincidencias:
+                x, y, w, h, p = coincidencias[0]
+                return [(x + vx, y + vy, w, h, p)], True
+    return buscar_segun_modo(imagen, plantilla, spec, piramide), False
+
+class MatchEngine:
+    """
+    Motor de coincidencias por fotograma.
+    Hace el preprocesado compartido una sola vez (gris, recortes por zona, pirámides)
+    y lanza los matchTemplate independientes en un pool de hilos (OpenCV libera el GIL).
+    Si la zona de un elemento no cambió desde su último análisis, reutiliza su resultado anterior.
+    Los elementos de un solo objetivo se buscan primero alrededor de su última posición.
+
+    Con backend="procesos" los matchTemplate y el post-proceso en Python (umbral,
+    agrupado de candidatos, NMS) se reparten en un pool de procesos (ver
+    backend_procesos.py), fuera del GIL del hilo del worker; `rutas_plantillas` se
+    precargan en cada proceso del pool.
+    """
+    def __init__(self, max_hilos=None, escala_grises=False, store=None, tolerancia_cambios=6,
+                 margenes_seguimiento=(16, 64), backend="hilos", max_procesos=None, rutas_plantillas=()):
+        self.escala_grises = escala_grises
+        self.store = store or template_store
+        # tolerancia_cambios=None desactiva la detección de cambios
+        self.detector = DetectorCambios(tolerancia_cambios) if tolerancia_cambios is not None else None
+        self._ultimos = {} # { nombre: coincidencias del último análisis }
+        # margenes_seguimiento=None desactiva el seguimiento temporal
+        self.margenes_seguimiento = margenes_seguimiento
+        self.seguidores = {} # { nombre: SeguidorElemento }
+        self.busquedas_realizadas = 0
+        self.busquedas_omitidas = 0
+        self.max_hilos = max_hilos or min(8, os.cpu_count() or 1)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_hilos, thread_name_prefix="MatchEngine")
+        self.backend = None
+        if backend == "procesos":
+            from app.logic.backend_procesos import BackendProcesos
+            # Cada proceso carga las plantillas al arrancar, no en su primera búsqueda
+            self.backend = BackendProcesos(max_procesos, escala_grises=escala_grises, rutas_plantillas=rutas_plantillas)
+        elif backend != "hilos":
+            raise ValueError(f"Backend de coincidencias desconocido: {backend}")
+        log.info(f"MatchEngine inicializado ({self.max_hilos} hilos, gris={self.escala_grises}, backend={backend}).")
+
+    def match_all(self, frame, elementos):
+        """
+        Busca todos los elementos en un mismo fotograma.
+
+        :param frame: Fotograma (ver captura.py) o captura completa como array de NumPy (en BGR).
+        :param elementos: { nombre: {"path_template": ..., "zona": (x, y, w, h) o None,
+                            "threshold": 0.7, "niveles_piramide": 0, "ventana_refinado": 8,
+                            "modo": "todas" | "mejor", "umbral_seguro": 0.95} }
+        :return: { nombre: [(x, y, w, h, puntuacion), ...] } en coordenadas del fotograma.
+        """
+        resultados = {nombre: [] for nombre in elementos}
+        if not isinstance(frame, Fotograma):
+            frame = Fotograma.completo(frame)
+        if self.escala_grises and frame.regiones and frame.regiones[0][1].ndim == 3:
+            frame = frame.convertir(cv2.COLOR_BGR2GRAY)
+
+        # Agrupar elementos por zona de búsqueda para recortar y preparar cada zona una sola vez
+        grupos = {}
+        for nombre, spec in elementos.items():
+            zona = spec.get("zona")
+            grupos.setdefault(tuple(zona) if zona else None, []).append(nombre)
+
+        trabajos = {}
+        for zona, nombres in grupos.items():
+            recorte = frame.recortar(zona)
+            if recorte is None:
+                log.debug(f"Zona {zona} fuera de las regiones capturadas.")
+                continue
+            imagen, offset_x, offset_y = recorte
+
+            # Zona sin cambios desde el último análisis de cada elemento: reutilizar su detección.
+            # La referencia es por elemento: en una misma zona no todos se analizan en el mismo fotograma.
+            if self.detector is not None:
+                firma = self.detector.firma(imagen)
+                pendientes = []
+                for nombre in nombres:
+                    clave = (zona, nombre)
+                    if nombre in self._ultimos and not self.detector.cambio(clave, firma=firma):
+                        resultados[nombre] = self._ultimos[nombre]
+                        self.busquedas_omitidas += 1
+                    else:
+                        self.detector.fijar(clave, firma) # Su resultado corresponderá a este fotograma
+                        pendientes.append(nombre)
+                if not pendientes:
+                    continue
+                nombres = pendientes
+
+            plantillas = {}
+            niveles_max = 0
+            requiere_piramide = False
+            for nombre in nombres:
+                spec = elementos[nombre]
+                plantilla = self.store.obtener(spec["path_template"])
+                if plantilla is None:
+                    log.warning(f"No se pudo cargar la plantilla {spec['path_template']}")
+                    self._ultimos[nombre] = []
+                    continue
+                if self.escala_grises:
+                    plantilla = plantilla.en_gris()
+                if imagen.shape[0] < plantilla.alto or imagen.shape[1] < plantilla.ancho:
+                    log.debug(f"Zona {zona} más pequeña que la plantilla de '{nombre}'. Se omite.")
+                    self._ultimos[nombre] = []
+                    continue
+                plantillas[nombre] = plantilla
+                niveles_max = max(niveles_max, spec.get("niveles_piramide", 0))
+                seguidor = self._seguidor(nombre, spec)
+                if seguidor is None or not seguidor.activo:
+                    requiere_piramide = True
+
+            # La pirámide de la zona se comparte entre todas sus plantillas.
+            # Si todas tienen posición conocida se omite: lo normal es acertar en la ventana.
+            piramide = construir_piramide(imagen, niveles_max) if niveles_max and requiere_piramide else None
+
+            # Límite de las ventanas de seguimiento, en coordenadas del fotograma
+            alto_zona, ancho_zona = imagen.shape[:2]
+            limite = (offset_x, offset_y, ancho_zona, alto_zona)
+
+            # Backend de procesos: la zona se publica una vez en memoria compartida para todos sus trabajos
+            zona_compartida = self.backend.publicar(zona, imagen) if self.backend is not None and plantillas else None
+
+            for nombre, plantilla in plantillas.items():
+                spec = elementos[nombre]
+                seguidor = self._seguidor(nombre, spec)
+                ventanas = ()
+                if seguidor is not None:
+                    ventanas = [(vx - offset_x, vy - offset_y, vw, vh) for (vx, vy, vw, vh) in seguidor.ventanas(limite)]
+                if zona_compartida is not None:
+                    futuro = self.backend.enviar(zona_compartida, plantilla.ruta, spec, ventanas)
+                else:
+                    futuro = self._pool.submit(buscar_con_ventanas, imagen, plantilla, spec, piramide, ventanas)
+                trabajos[nombre] = (futuro, offset_x, offset_y, seguidor)
+
+        for nombre, (futuro, offset_x, offset_y, seguidor) in trabajos.items():
+            coincidencias, en_ventana = futuro.result()
+            resultados[nombre] = [(x + offset_x, y + offset_y, w, h, p) for (x, y, w, h, p) in coincidencias]
+            self._ultimos[nombre] = resultados[nombre]
+            if seguidor is not None:
+                if resultados[nombre]:
+                    seguidor.registrar_acierto(resultados[nombre][0][:4], en_ventana=en_ventana)
+                else:
+                    seguidor.registrar_fallo()
+        self.busquedas_realizadas += len(trabajos)
+
+        return resultados
+
+    def _seguidor(self, nombre, spec):
+        """Devuelve el seguidor del elemento, o None si no usa seguimiento."""
+        # Solo tiene sentido para elementos de un objetivo (una única posición que seguir)
+        if self.margenes_seguimiento is None or spec.get("modo") != "mejor" or not spec.get("seguimiento", True):
+            return None
+        seguidor = self.seguidores.get(nombre)
+        if seguidor is None:
+            seguidor = SeguidorElemento(self.margenes_seguimiento)
+            self.seguidores[nombre] = seguidor
+        return seguidor
+
+    def invalidar(self, nombre=None):
+        """Olvida los resultados reutilizables (p. ej. después de un clic que cambia la pantalla)."""
+        if nombre is None:
+            self._ultimos.clear()
+            if self.detector is not None:
+                self.detector.olvidar()
+        else:
+            self._ultimos.pop(nombre, None)
+
+    def estadisticas(self):
+        """Devuelve los contadores de búsquedas realizadas y omitidas."""
+        seguimiento = {}
+        for seguidor in self.seguidores.values():
+            for clave, valor in seguidor.estadisticas().items():
+                seguimiento[clave] = seguimiento.get(clave, 0) + valor
+        return {"realizadas": self.busquedas_realizadas, "omitidas": self.busquedas_omitidas,
+                "seguimiento": seguimiento}
+
+    def cerrar(self):
+        """Libera el pool de hilos (y el de procesos, si se usa)."""
+        self._pool.shutdown(wait=True)
+        if self.backend is not None:
+            self.backend.cerrar()
@@ -0,0 +1,102 @@
+import heapq
+import itertools
+import random
+import logging
+
+log = logging.getLogger("QA_Tool.planificador")
+
+class EstadoElemento:
+    """Parámetros y estado de planificación de un elemento."""
+    __slots__ = ("nombre", "intervalo", "intervalo_actual", "intervalo_max", "prioridad",
+                 "backoff", "enfriamiento", "version", "proximo", "fallos_seguidos")
+
+    def __init__(self, nombre, intervalo, prioridad, backoff, intervalo_max, enfriamiento):
+        self.nombre = nombre
+        self.intervalo = intervalo
+        self.intervalo_actual = intervalo
+        self.intervalo_max = max(intervalo, intervalo_max)
+        self.prioridad = prioridad
+        self.backoff = backoff
+        self.enfriamiento = enfriamiento
+        self.version = 0
+        self.proximo = 0.0
+        self.fallos_seguidos = 0
+
+class PlanificadorElementos:
+    """
+    Planificador de comprobaciones por elemento sobre una cola de prioridad (heap).
+
+    Cada elemento tiene su propia cadencia de escaneo, prioridad (menor = antes),
+    backoff multiplicativo tras fallos y enfriamiento tras un acierto. El bucle del
+    worker solo necesita dormir hasta proximo_vencimiento().
+    """
+    def __init__(self, variacion=0.1):
+        self.variacion = variacion # Variación aleatoria (±) de los intervalos
+        self._heap = [] # (instante, prioridad, orden, nombre, version)
+        self._estados = {}
+        self._orden = itertools.count()
+
+    def agregar(self, nombre, intervalo=1.0, prioridad=0, backoff=1.5, intervalo_max=8.0,
+                enfriamiento=2.0, instante=0.0):
+        """Registra un elemento; su primera comprobación vence en `instante`."""
+        estado = EstadoElemento(nombre, intervalo, prioridad, backoff, intervalo_max, enfriamiento)
+        self._estados[nombre] = estado
+        self._programar(estado, instante)
+
+    def _programar(self, estado, instante):
+        estado.version += 1
+        estado.proximo = instante
+        heapq.heappush(self._heap, (instante, estado.prioridad, next(self._orden), estado.nombre, estado.version))
+
+    def _variar(self, segundos):
+        return segundos * random.uniform(1 - self.variacion, 1 + self.variacion)
+
+    def _limpiar_cabeza(self):
+        """Descarta entradas obsoletas (reprogramadas) de la cabeza del heap."""
+        while self._heap:
+            _, _, _, nombre, version = self._heap[0]
+            estado = self._estados.get(nombre)
+            if estado is not None and estado.version == version:
+                return
+            heapq.heappop(self._heap)
+
+    def proximo_vencimiento(self):
+        """Instante de la siguiente comprobación pendiente, o None si no hay elementos."""
+        self._limpiar_cabeza()
+        return self._heap[0][0] if self._heap else None
+
+    def vencidos(self, ahora):
+        """
+        Saca del heap los elementos cuya comprobación ya venció.
+        Devuelve sus nombres ordenados por prioridad; hay que reprogramarlos
+        con registrar_resultado() (o posponer()).
+        """
+        vencidos = []
+        while True:
+            self._limpiar_cabeza()
+            if not self._heap or self._heap[0][0] > ahora:
+                break
+            _, prioridad, orden, nombre, _ = heapq.heappop(self._heap)
+            self._estados[nombre].version += 1 # Fuera del heap hasta que se reprograme
+            vencidos.append((prioridad, orden, nombre))
+        return [nombre for _, _, nombre in sorted(vencidos)]
+
+    def registrar_resultado(self, nombre, encontrado, ahora):
+        """Reprograma un elemento según el resultado de su comprobación."""
+        estado = self._estados[nombre]
+        if encontrado:
+            estado.fallos_seguidos = 0
+            estado.intervalo_actual = estado.intervalo
+            self._programar(estado, ahora + self._variar(estado.enfriamiento))
+        else:
+            estado.fallos_seguidos += 1
+            if estado.fallos_seguidos > 1:
+                estado.intervalo_actual = min(estado.intervalo_actual * estado.backoff, estado.intervalo_max)
+            self._programar(estado, ahora + self._variar(estado.intervalo_actual))
+
+    def posponer(self, nombre, instante):
+        """Reprograma un elemento para `instante` sin tocar su backoff."""
+        self._programar(self._estados[nombre], instante)
+
+    def estado(self, nombre):
+        return self._estados.get(nombre)
@@ -0,0 +1,86 @@
+import time
+import logging
+
+log = logging.getLogger("QA_Tool.seguimiento")
+
+class SeguidorElemento:
+    """
+    Seguimiento temporal de un elemento: recuerda su última posición y velocidad
+    y propone ventanas de búsqueda cada vez más grandes alrededor de la posición prevista.
+    Si ninguna ventana acierta, el llamador busca en la zona calibrada o en toda la pantalla.
+    """
+    def __init__(self, margenes=(16, 64), suavizado=0.5):
+        self.margenes = tuple(margenes) # Política de expansión (píxeles alrededor de la predicción)
+        self.suavizado = suavizado
+        self.ultima = None # (x, y, w, h) en coordenadas del fotograma
+        self.velocidad = (0.0, 0.0) # píxeles por segundo
+        self.instante = None
+        self.aciertos_ventana = 0
+        self.fallos_ventana = 0
+        self.aciertos_completos = 0
+        self.fallos_completos = 0
+
+    @property
+    def activo(self):
+        return self.ultima is not None
+
+    def prediccion(self, ahora=None):
+        """Devuelve la posición (x, y) prevista para el instante `ahora`."""
+        x, y, _, _ = self.ultima
+        dt = (ahora or time.monotonic()) - self.instante
+        dt = min(max(dt, 0.0), 2.0) # No extrapolar demasiado lejos
+        return x + self.velocidad[0] * dt, y + self.velocidad[1] * dt
+
+    def ventanas(self, limite, ahora=None):
+        """
+        Genera las ventanas de búsqueda (x, y, w, h), de la más pequeña a la más grande,
+        recortadas al rectángulo `limite` (zona calibrada o fotograma completo).
+        """
+        if not self.activo:
+            return
+        px, py = self.prediccion(ahora)
+        _, _, w, h = self.ultima
+        lx, ly, lw, lh = limite
+        for margen in self.margenes:
+            x0 = max(lx, int(px) - margen)
+            y0 = max(ly, int(py) - margen)
+            x1 = min(lx + lw, int(px) + w + margen)
+            y1 = min(ly + lh, int(py) + h + margen)
+            if x1 - x0 >= w and y1 - y0 >= h:
+                yield (x0, y0, x1 - x0, y1 - y0)
+
+    def registrar_acierto(self, rect, en_ventana, ahora=None):
+        """Actualiza posición y velocidad con una nueva detección."""
+        ahora = ahora or time.monotonic()
+        if en_ventana:
+            self.aciertos_ventana += 1
+            dt = ahora - self.instante
+            if dt > 0:
+                vx = (rect[0] - self.ultima[0]) / dt
+                vy = (rect[1] - self.ultima[1]) / dt
+                a = self.suavizado
+                self.velocidad = (a * vx + (1 - a) * self.velocidad[0], a * vy + (1 - a) * self.velocidad[1])
+        else:
+            # Encontrado lejos de la predicción: no es un movimiento continuo
+            if self.activo:
+                self.fallos_ventana += 1
+            self.aciertos_completos += 1
+            self.velocidad = (0.0, 0.0)
+        self.ultima = tuple(rect[:4])
+        self.instante = ahora
+
+    def registrar_fallo(self):
+        """El elemento no se encontró ni en las ventanas ni en la búsqueda completa."""
+        if self.activo:
+            self.fallos_ventana += 1
+        self.fallos_completos += 1
+        self.ultima = None
+        self.velocidad = (0.0, 0.0)
+
+    def estadisticas(self):
+        return {
+            "aciertos_ventana": self.aciertos_ventana,
+            "fallos_ventana": self.fallos_ventana,
+            "aciertos_completos": self.aciertos_completos,
+            "fallos_completos": self.fallos_completos,
+        }
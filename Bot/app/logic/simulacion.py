@@ -1,26 +1,134 @@
-import logging
-
-log = logging.getLogger("QA_Tool.simulacion")
-
-class SimulationManager:
-    """
-    Clase placeholder para manejar timers y estados offline.
-    Debería ser expandida para manejar una cola de eventos.
-    """
-    def __init__(self, config_elementos):
-        self.config = config_elementos
-        self.timers_activos = {}
-        log.info("SimulationManager inicializado.")
-
-    def iniciar_timer(self, nombre_elemento, duracion_segundos):
-        """Inicia un timer de simulación para un elemento."""
-        # Lógica de simulación (ej. guardar time.time() + duracion)
-        log.info(f"Timer de simulación iniciado para '{nombre_elemento}' por {duracion_segundos}s")
-        self.timers_activos[nombre_elemento] = "placeholder_data"
-
-    def verificar_timers(self):
-        """Verifica si algún timer ha expirado."""
-        # Lógica de verificación
-        if self.timers_activos:
-            log.debug("Verificando timers de simulación...")
-        return [] # Devuelve lista de eventos listos
\ No newline at end of file
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger("QA_Tool.simulacion")
+
+RUTA_TIMERS = "resources/timers_simulacion.json"
+
+class SimulationManager:
+    """
+    Timers de reaparición/enfriamiento por elemento sobre un min-heap.
+
+    Mientras el timer de un elemento está activo el elemento no puede existir en
+    pantalla, así que el worker no lo busca. Los vencimientos se guardan en disco
+    (hora de reloj, no monotónica) para sobrevivir a reinicios de la herramienta;
+    con ruta_estado=None solo viven en memoria.
+    """
+    def __init__(self, config_elementos, ruta_estado=RUTA_TIMERS):
+        self.config = config_elementos
+        self.ruta_estado = ruta_estado
+        self.timers_activos = {} # nombre -> instante de vencimiento (time.time())
+        self._heap = [] # (vencimiento, nombre); entradas obsoletas se descartan al sacarlas
+        self._lock = threading.Lock()
+        self.cargar()
+        log.info(f"SimulationManager inicializado ({len(self.timers_activos)} timers activos).")
+
+    def duracion_por_defecto(self, nombre_elemento):
+        """Tiempo de reaparición configurado para el elemento (0 = sin timer)."""
+        return self.config.get(nombre_elemento, {}).get("tiempo_reaparicion", 0)
+
+    def iniciar_timer(self, nombre_elemento, duracion_segundos=None):
+        """
+        Inicia (o reinicia) el timer de un elemento.
+        :param duracion_segundos: Si es None se usa 'tiempo_reaparicion' de su configuración.
+        :return: Instante de vencimiento (time.time()), o None si no hay timer que iniciar.
+        """
+        if duracion_segundos is None:
+            duracion_segundos = self.duracion_por_defecto(nombre_elemento)
+        if not duracion_segundos or duracion_segundos <= 0:
+            return None
+        vencimiento = time.time() + duracion_segundos
+        with self._lock:
+            self.timers_activos[nombre_elemento] = vencimiento
+            heapq.heappush(self._heap, (vencimiento, nombre_elemento))
+            self._guardar()
+        log.info(f"Timer de simulación iniciado para '{nombre_elemento}' por {duracion_segundos}s")
+        return vencimiento
+
+    def cancelar_timer(self, nombre_elemento):
+        """Elimina el timer de un elemento (la entrada del heap queda obsoleta)."""
+        with self._lock:
+            if self.timers_activos.pop(nombre_elemento, None) is not None:
+                self._guardar()
+
+    def restante(self, nombre_elemento, ahora=None):
+        """Segundos que faltan para que venza el timer del elemento (0 si no tiene)."""
+        vencimiento = self.timers_activos.get(nombre_elemento)
+        if vencimiento is None:
+            return 0.0
+        return max(vencimiento - (time.time() if ahora is None else ahora), 0.0)
+
+    def activo(self, nombre_elemento, ahora=None):
+        return self.restante(nombre_elemento, ahora) > 0
+
+    def proximo_vencimiento(self):
+        """Instante (time.time()) del siguiente timer que vence, o None."""
+        with self._lock:
+            self._limpiar_cabeza()
+            return self._heap[0][0] if self._heap else None
+
+    def verificar_timers(self, ahora=None):
+        """
+        Saca los timers que ya vencieron.
+        :return: Lista de nombres de elementos que vuelven a estar disponibles.
+        """
+        ahora = time.time() if ahora is None else ahora
+        listos = []
+        with self._lock:
+            while True:
+                self._limpiar_cabeza()
+                if not self._heap or self._heap[0][0] > ahora:
+                    break
+                _, nombre = heapq.heappop(self._heap)
+                del self.timers_activos[nombre]
+                listos.append(nombre)
+            if listos:
+                self._guardar()
+        if listos:
+            log.debug(f"Timers vencidos: {listos}")
+        return listos
+
+    def _limpiar_cabeza(self):
+        """Descarta entradas del heap reemplazadas o canceladas."""
+        while self._heap:
+            vencimiento, nombre = self._heap[0]
+            if self.timers_activos.get(nombre) == vencimiento:
+                return
+            heapq.heappop(self._heap)
+
+    def cargar(self):
+        """Lee los timers guardados; los que vencieron mientras la herramienta estaba cerrada se descartan."""
+        if not self.ruta_estado or not os.path.exists(self.ruta_estado):
+            return
+        try:
+            with open(self.ruta_estado, 'r') as f:
+                datos = json.load(f)
+        except Exception as e:
+            log.error(f"No se pudieron cargar los timers de {self.ruta_estado}: {e}")
+            return
+        ahora = time.time()
+        with self._lock:
+            for nombre, vencimiento in datos.get("timers", {}).items():
+                if vencimiento > ahora:
+                    self.timers_activos[nombre] = vencimiento
+            self._heap = [(v, n) for n, v in self.timers_activos.items()]
+            heapq.heapify(self._heap)
+
+    def _guardar(self):
+        """Escribe los timers de forma atómica (archivo temporal + reemplazo). Requiere el lock."""
+        if not self.ruta_estado:
+            return
+        directorio = os.path.dirname(self.ruta_estado)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        temporal = self.ruta_estado + ".tmp"
+        try:
+            with open(temporal, 'w') as f:
+                json.dump({"timers": self.timers_activos}, f, indent=4)
+            os.replace(temporal, self.ruta_estado)
+        except Exception as e:
+            log.error(f"No se pudieron guardar los timers en {self.ruta_estado}: {e}")
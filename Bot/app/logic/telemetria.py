@@ -0,0 +1,116 @@
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+from types import MappingProxyType
+
+log = logging.getLogger("QA_Tool.telemetria")
+
+# Estado publicado de una vez. contadores es de solo lectura y lineas_log son
+# solo las líneas nuevas desde la instantánea anterior: [(instante time.time(), mensaje)]
+InstantaneaTelemetria = namedtuple("InstantaneaTelemetria", ["secuencia", "estado", "tiempo_restante", "contadores",
+                                                             "lineas_log", "lineas_descartadas"])
+
+class AgregadorTelemetria:
+    """
+    Reúne estado, tiempo restante, contadores y líneas de log del motor y los
+    publica como una sola InstantaneaTelemetria a frecuencia fija.
+
+    Los métodos de registro (estado, tiempo, log, contador) solo guardan el último
+    valor bajo un lock, así que sirven directamente como callbacks del motor desde
+    cualquier hilo. Un hilo propio llama a `publicar` como mucho `frecuencia` veces
+    por segundo y solo si algo cambió: el coste de notificar a la GUI no depende de
+    lo rápido que gire el bucle.
+    """
+    def __init__(self, publicar, frecuencia=5.0, max_lineas=200):
+        """
+        :param publicar: Callable(InstantaneaTelemetria), p. ej. el emit de una señal Qt.
+        :param frecuencia: Instantáneas por segundo como máximo.
+        :param max_lineas: Líneas de log retenidas entre dos instantáneas (las más antiguas se descartan).
+        """
+        self.publicar = publicar
+        self.periodo = 1.0 / max(frecuencia, 0.1)
+        self._lock = threading.Lock()
+        self._estado = ""
+        self._tiempo_restante = ""
+        self._contadores = {}
+        self._lineas = deque(maxlen=max_lineas)
+        self._lineas_descartadas = 0
+        self._cambios = False
+        self._secuencia = 0
+        self._parar = threading.Event()
+        self._hilo = None
+
+    # --- Registro (callbacks del motor) ---
+
+    def estado(self, texto):
+        with self._lock:
+            self._estado = texto
+            self._cambios = True
+
+    def tiempo(self, texto):
+        with self._lock:
+            if texto != self._tiempo_restante:
+                self._tiempo_restante = texto
+                self._cambios = True
+
+    def log(self, mensaje):
+        with self._lock:
+            if len(self._lineas) == self._lineas.maxlen:
+                self._lineas_descartadas += 1
+            self._lineas.append((time.time(), mensaje))
+            self._cambios = True
+
+    def contador(self, nombre, valor):
+        with self._lock:
+            if self._contadores.get(nombre) != valor:
+                self._contadores[nombre] = valor
+                self._cambios = True
+
+    # --- Publicación ---
+
+    def instantanea(self):
+        """Toma el estado acumulado y vacía las líneas de log pendientes."""
+        with self._lock:
+            self._secuencia += 1
+            instantanea = InstantaneaTelemetria(
+                secuencia=self._secuencia,
+                estado=self._estado,
+                tiempo_restante=self._tiempo_restante,
+                contadores=MappingProxyType(dict(self._contadores)),
+                lineas_log=tuple(self._lineas),
+                lineas_descartadas=self._lineas_descartadas,
+            )
+            self._lineas.clear()
+            self._lineas_descartadas = 0
+            self._cambios = False
+        return instantanea
+
+    def publicar_ahora(self):
+        """Publica una instantánea si hay cambios pendientes (p. ej. justo antes de finalizar)."""
+        with self._lock:
+            if not self._cambios:
+                return
+        try:
+            self.publicar(self.instantanea())
+        except Exception as e:
+            log.error(f"Error al publicar la telemetría: {e}")
+
+    def iniciar(self):
+        if self._hilo is not None:
+            return
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._ejecutar, name="Telemetria", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        """Detiene el hilo y publica lo que quede pendiente."""
+        self._parar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=2.0)
+            self._hilo = None
+        self.publicar_ahora()
+
+    def _ejecutar(self):
+        while not self._parar.wait(self.periodo):
+            self.publicar_ahora()
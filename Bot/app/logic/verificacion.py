@@ -0,0 +1,91 @@
+import cv2
+import numpy as np
+import logging
+from collections import deque
+
+log = logging.getLogger("QA_Tool.verificacion")
+
+class LatenciaElemento:
+    """Latencias observadas entre el fin de una acción y el cambio en pantalla de un elemento."""
+    __slots__ = ("muestras", "confirmadas", "sin_cambio")
+
+    def __init__(self, max_muestras=50):
+        self.muestras = deque(maxlen=max_muestras)
+        self.confirmadas = 0
+        self.sin_cambio = 0
+
+    def percentil(self, p):
+        ordenadas = sorted(self.muestras)
+        return ordenadas[min(len(ordenadas) - 1, int(p * len(ordenadas)))]
+
+class VerificadorAcciones:
+    """
+    Verificación posterior a cada acción: compara la zona clicada con su estado
+    anterior (firma reducida en gris, como DetectorCambios) en cada fotograma nuevo
+    y da la acción por buena en cuanto la zona cambia.
+
+    El tiempo de espera de cada elemento se aprende de sus latencias: percentil 90
+    por un margen, acotado entre timeout_min y timeout_max. Hasta reunir
+    `muestras_minimas` se usa timeout_inicial.
+    """
+    def __init__(self, tolerancia=12, tam_celda=4, timeout_inicial=1.5, timeout_min=0.2, timeout_max=3.0,
+                 margen=2.0, muestras_minimas=5):
+        self.tolerancia = tolerancia
+        self.tam_celda = max(1, tam_celda)
+        self.timeout_inicial = timeout_inicial
+        self.timeout_min = timeout_min
+        self.timeout_max = timeout_max
+        self.margen = margen
+        self.muestras_minimas = muestras_minimas
+        self._latencias = {} # { clave_elemento: LatenciaElemento }
+
+    def firma(self, imagen):
+        """Firma reducida en gris de una zona (se compara con cambio())."""
+        if imagen.ndim == 3:
+            imagen = cv2.cvtColor(imagen, cv2.COLOR_BGR2GRAY)
+        alto, ancho = imagen.shape[:2]
+        tam = (max(1, ancho // self.tam_celda), max(1, alto // self.tam_celda))
+        return cv2.resize(imagen, tam, interpolation=cv2.INTER_AREA)
+
+    def cambio(self, firma_referencia, imagen):
+        """Indica si la zona difiere de forma apreciable de su firma de referencia."""
+        firma_actual = self.firma(imagen)
+        if firma_actual.shape != firma_referencia.shape:
+            return True
+        return int(np.max(cv2.absdiff(firma_referencia, firma_actual))) > self.tolerancia
+
+    def _elemento(self, clave):
+        latencia = self._latencias.get(clave)
+        if latencia is None:
+            latencia = LatenciaElemento()
+            self._latencias[clave] = latencia
+        return latencia
+
+    def timeout(self, clave):
+        """Segundos a esperar el cambio tras una acción sobre el elemento."""
+        latencia = self._latencias.get(clave)
+        if latencia is None or len(latencia.muestras) < self.muestras_minimas:
+            return self.timeout_inicial
+        return min(max(latencia.percentil(0.9) * self.margen, self.timeout_min), self.timeout_max)
+
+    def registrar_cambio(self, clave, segundos):
+        latencia = self._elemento(clave)
+        latencia.muestras.append(segundos)
+        latencia.confirmadas += 1
+
+    def registrar_sin_cambio(self, clave):
+        self._elemento(clave).sin_cambio += 1
+        log.warning(f"'{clave}': la pantalla no cambió tras la acción (timeout {self.timeout(clave):.2f}s).")
+
+    def estadisticas(self):
+        """{ elemento: {"confirmadas", "sin_cambio", "p50", "p90", "timeout"} }"""
+        resumen = {}
+        for clave, latencia in self._latencias.items():
+            resumen[clave] = {
+                "confirmadas": latencia.confirmadas,
+                "sin_cambio": latencia.sin_cambio,
+                "p50": round(latencia.percentil(0.5), 3) if latencia.muestras else None,
+                "p90": round(latencia.percentil(0.9), 3) if latencia.muestras else None,
+                "timeout": round(self.timeout(clave), 3),
+            }
+        return resumen
@@ -1,55 +1,393 @@
-import cv2
-import numpy as np
-import logging
-
-log = logging.getLogger("QA_Tool.vision")
-
-def find_template(screen_image_np, template_image_path, threshold=0.8):
-    """
-    Busca una imagen de plantilla dentro de una imagen de pantalla.
-    
-    :param screen_image_np: Imagen de pantalla (captura) como array de NumPy (en BGR).
-    :param template_image_path: Ruta a la imagen de plantilla (en BGR).
-    :param threshold: Umbral de confianza (0.0 a 1.0).
-    :return: Lista de tuplas (x, y, w, h) de todas las coincidencias encontradas.
-    """
-    try:
-        template = cv2.imread(template_image_path)
-        if template is None:
-            log.warning(f"No se pudo cargar la plantilla {template_image_path}")
-            return []
-            
-        t_h, t_w = template.shape[:2]
-        
-        # Realizar la coincidencia de plantillas
-        result = cv2.matchTemplate(screen_image_np, template, cv2.TM_CCOEFF_NORMED)
-        
-        # Encontrar todas las ubicaciones que superen el umbral
-        locations = np.where(result >= threshold)
-        
-        # Agrupar rectángulos superpuestos
-        rectangles = []
-        for (x, y) in zip(locations[1], locations[0]):
-            rectangles.append([int(x), int(y), int(t_w), int(t_h)])
-            
-        # NMS (Non-Max Suppression) simple para agrupar rectángulos
-        # OpenCV groupRectangles es mejor, pero esto funciona para UIs simples
-        matches = []
-        for (x, y, w, h) in rectangles:
-            # Simple check para evitar duplicados muy cercanos
-            found_close = False
-            for (mx, my, mw, mh) in matches:
-                if abs(x - mx) < 10 and abs(y - my) < 10:
-                    found_close = True
-                    break
-            if not found_close:
-                matches.append((x, y, w, h))
-        
-        if matches:
-            log.debug(f"Plantilla {template_image_path} encontrada en {len(matches)} ubicaciones.")
-            
-        return matches
-        
-    except Exception as e:
-        log.error(f"Error en find_template: {e}")
-        return []
\ No newline at end of file
+import cv2
+import numpy as np
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+log = logging.getLogger("QA_Tool.vision")
+
+class Plantilla:
+    """
+    Plantilla ya decodificada, lista para pasarse a find_template sin volver a leer el disco.
+    """
+    __slots__ = ("ruta", "imagen", "ancho", "alto", "_piramide", "_gris", "_detalle")
+
+    def __init__(self, ruta, imagen):
+        self.ruta = ruta
+        self.imagen = imagen
+        self.alto, self.ancho = imagen.shape[:2]
+        self._piramide = [imagen]
+        self._gris = None
+        self._detalle = {}
+
+    def nivel(self, n):
+        """Devuelve la plantilla reducida n veces a la mitad (se calcula una sola vez)."""
+        # Se reemplaza la lista entera en vez de hacer append para que sea seguro entre hilos
+        piramide = self._piramide
+        while len(piramide) <= n:
+            piramide = piramide + [cv2.pyrDown(piramide[-1])]
+        self._piramide = piramide
+        return piramide[n]
+
+    def detalle(self, n):
+        """
+        Fracción del contraste (desviación típica) que conserva el nivel n de la pirámide.
+        Cerca de 0 = el detalle es más fino que el nivel (tramas, texto pequeño) o la plantilla es uniforme.
+        """
+        if n not in self._detalle:
+            base = float(self.imagen.std())
+            self._detalle[n] = float(self.nivel(n).std()) / base if base > 0 else 0.0
+        return self._detalle[n]
+
+    def en_gris(self):
+        """Devuelve la versión en escala de grises de la plantilla (se calcula una sola vez)."""
+        if self._gris is None:
+            if self.imagen.ndim == 2:
+                self._gris = self
+            else:
+                self._gris = Plantilla(self.ruta, cv2.cvtColor(self.imagen, cv2.COLOR_BGR2GRAY))
+        return self._gris
+
+    def __repr__(self):
+        return f"Plantilla({self.ruta!r}, {self.ancho}x{self.alto})"
+
+class TemplateStore:
+    """
+    Caché LRU de plantillas decodificadas.
+    Cada entrada se identifica por su ruta y se invalida si cambia el mtime o el tamaño del archivo.
+    """
+    def __init__(self, max_plantillas=64):
+        self.max_plantillas = max(1, max_plantillas)
+        self._cache = OrderedDict() # { ruta: ((mtime_ns, tamaño), Plantilla) }
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+        self.expulsiones = 0
+
+    def obtener(self, ruta):
+        """
+        Devuelve la Plantilla de `ruta`, decodificándola solo si no está en caché o si el archivo cambió.
+
+        :param ruta: Ruta a la imagen de plantilla.
+        :return: Plantilla, o None si el archivo no existe o no se puede decodificar.
+        """
+        try:
+            st = os.stat(ruta)
+        except OSError:
+            with self._lock:
+                self.fallos += 1
+                self._cache.pop(ruta, None)
+            return None
+        firma = (st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            entrada = self._cache.get(ruta)
+            if entrada is not None:
+                if entrada[0] == firma:
+                    self._cache.move_to_end(ruta)
+                    self.aciertos += 1
+                    return entrada[1]
+                # El archivo cambió en disco desde que se decodificó
+                del self._cache[ruta]
+                self.invalidaciones += 1
+            self.fallos += 1
+
+        # Decodificar fuera del lock para no bloquear a otros hilos
+        imagen = cv2.imread(ruta)
+        if imagen is None:
+            return None
+        plantilla = Plantilla(ruta, imagen)
+
+        with self._lock:
+            self._cache[ruta] = (firma, plantilla)
+            self._cache.move_to_end(ruta)
+            while len(self._cache) > self.max_plantillas:
+                ruta_expulsada, _ = self._cache.popitem(last=False)
+                self.expulsiones += 1
+                log.debug(f"Plantilla expulsada de la caché: {ruta_expulsada}")
+        return plantilla
+
+    def limpiar(self):
+        """Vacía la caché (los contadores se mantienen)."""
+        with self._lock:
+            self._cache.clear()
+
+    def estadisticas(self):
+        """Devuelve los contadores de la caché como diccionario."""
+        with self._lock:
+            return {
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "invalidaciones": self.invalidaciones,
+                "expulsiones": self.expulsiones,
+                "en_cache": len(self._cache),
+            }
+
+# Caché compartida por defecto
+template_store = TemplateStore()
+
+# Modo pirámide: la búsqueda gruesa usa un umbral más permisivo para no perder candidatos,
+# y la plantilla reducida no debe quedar por debajo de este tamaño ni perder casi todo su contraste.
+MARGEN_UMBRAL_PIRAMIDE = 0.15
+LADO_MINIMO_PIRAMIDE = 8
+DETALLE_MINIMO_PIRAMIDE = 0.05
+MAX_PICOS_PIRAMIDE = 20 # Solo find_best/find_first: find_template refina todos los picos
+
+def _maximos_locales(result, threshold, t_w, t_h):
+    """
+    Reduce el mapa de resultados a los máximos locales que superan el umbral.
+
+    :return: Arrays (xs, ys, puntuaciones) de los candidatos.
+    """
+    # Los píxeles planos (plantillas uniformes) producen NaN/inf en TM_CCOEFF_NORMED
+    cv2.patchNaNs(result, 0)
+
+    # Un píxel es máximo local si coincide con el máximo de su vecindad (~ media plantilla)
+    k_w = max(3, (t_w // 2) | 1)
+    k_h = max(3, (t_h // 2) | 1)
+    dilatado = cv2.dilate(result, np.ones((k_h, k_w), np.uint8))
+    mascara = (result >= threshold) & (result >= dilatado)
+
+    ys, xs = np.nonzero(mascara)
+    puntuaciones = result[ys, xs]
+
+    # Las mesetas (zonas con la misma puntuación) sobreviven a la dilatación:
+    # quedarse con el mejor candidato por celda de 1/4 de plantilla antes del NMS.
+    celda_w = max(1, t_w // 4)
+    celda_h = max(1, t_h // 4)
+    if len(xs) > 1:
+        columnas = result.shape[1] // celda_w + 1
+        claves = (ys // celda_h) * columnas + (xs // celda_w)
+        orden = np.lexsort((-puntuaciones, claves))
+        claves = claves[orden]
+        primeros = np.empty(len(claves), dtype=bool)
+        primeros[0] = True
+        primeros[1:] = claves[1:] != claves[:-1]
+        seleccion = orden[primeros]
+        xs, ys, puntuaciones = xs[seleccion], ys[seleccion], puntuaciones[seleccion]
+
+    return xs, ys, puntuaciones
+
+def _suprimir_no_maximos(xs, ys, puntuaciones, t_w, t_h, iou_max=0.3):
+    """
+    NMS vectorizado ordenado por puntuación para rectángulos del mismo tamaño (t_w x t_h).
+
+    :return: Lista de tuplas (x, y, w, h, puntuacion) ordenada de mejor a peor.
+    """
+    if len(puntuaciones) == 0:
+        return []
+
+    orden = np.argsort(-puntuaciones, kind="stable")
+    xs, ys, puntuaciones = xs[orden], ys[orden], puntuaciones[orden]
+    area = float(t_w * t_h)
+
+    conservados = []
+    restantes = np.arange(len(puntuaciones))
+    while restantes.size:
+        i = restantes[0]
+        conservados.append(i)
+        resto = restantes[1:]
+        inter_w = np.maximum(0, t_w - np.abs(xs[resto] - xs[i]))
+        inter_h = np.maximum(0, t_h - np.abs(ys[resto] - ys[i]))
+        interseccion = inter_w * inter_h
+        iou = interseccion / (2 * area - interseccion)
+        restantes = resto[iou <= iou_max]
+
+    return [(int(xs[i]), int(ys[i]), int(t_w), int(t_h), float(puntuaciones[i])) for i in conservados]
+
+def construir_piramide(imagen, niveles):
+    """
+    Construye la pirámide de una imagen: [original, 1/2, 1/4, ...] con `niveles` reducciones.
+    """
+    piramide = [imagen]
+    for _ in range(niveles):
+        piramide.append(cv2.pyrDown(piramide[-1]))
+    return piramide
+
+def _niveles_utiles(plantilla, niveles):
+    """Limita los niveles para que la plantilla reducida siga teniendo tamaño y detalle suficientes."""
+    while niveles > 0 and (min(plantilla.ancho, plantilla.alto) >> niveles < LADO_MINIMO_PIRAMIDE
+                           or plantilla.detalle(niveles) < DETALLE_MINIMO_PIRAMIDE):
+        niveles -= 1
+    return niveles
+
+def _buscar_completo(imagen, plantilla, threshold):
+    """Coincidencia a resolución completa. Devuelve (xs, ys, puntuaciones) de los candidatos."""
+    result = cv2.matchTemplate(imagen, plantilla.imagen, cv2.TM_CCOEFF_NORMED)
+    return _maximos_locales(result, threshold, plantilla.ancho, plantilla.alto)
+
+def _ventanas_refinado(piramide, plantilla, threshold, niveles, ventana_refinado, iou_max=0.3, max_picos=None):
+    """
+    Localiza picos en el nivel reducido de la pirámide y genera, de mejor a peor pico,
+    las ventanas (x0, y0, x1, y1) a resolución completa donde hay que volver a comparar.
+
+    :param max_picos: Picos refinados como máximo (None = todos).
+    """
+    alto_img, ancho_img = piramide[0].shape[:2]
+    t_w, t_h = plantilla.ancho, plantilla.alto
+    escala = 1 << niveles
+
+    plantilla_gruesa = plantilla.nivel(niveles)
+    g_h, g_w = plantilla_gruesa.shape[:2]
+    result_grueso = cv2.matchTemplate(piramide[niveles], plantilla_gruesa, cv2.TM_CCOEFF_NORMED)
+    xs_g, ys_g, punt_g = _maximos_locales(result_grueso, threshold - MARGEN_UMBRAL_PIRAMIDE, g_w, g_h)
+    picos = _suprimir_no_maximos(xs_g, ys_g, punt_g, g_w, g_h, iou_max)
+    if max_picos is not None and len(picos) > max_picos:
+        log.debug(f"Pirámide: {len(picos)} picos gruesos de {plantilla.ruta}, se refinan los {max_picos} mejores.")
+        picos = picos[:max_picos]
+
+    # El error de posición del nivel grueso es de hasta `escala` píxeles
+    margen = ventana_refinado + escala
+    for (gx, gy, _, _, _) in picos:
+        x0 = max(0, gx * escala - margen)
+        y0 = max(0, gy * escala - margen)
+        x1 = min(ancho_img, gx * escala + t_w + margen)
+        y1 = min(alto_img, gy * escala + t_h + margen)
+        if x1 - x0 >= t_w and y1 - y0 >= t_h:
+            yield x0, y0, x1, y1
+
+def _buscar_piramide(piramide, plantilla, threshold, niveles, ventana_refinado, iou_max):
+    """
+    Búsqueda gruesa a fina: localiza picos en el nivel reducido y vuelve a comparar
+    a resolución completa solo en ventanas pequeñas alrededor de cada pico.
+    Devuelve (xs, ys, puntuaciones) en coordenadas de la imagen original, o None si
+    la pasada gruesa no encontró ningún pico (el llamador repite a resolución completa).
+    """
+    imagen = piramide[0]
+    xs, ys, puntuaciones = [], [], []
+    ventanas = 0
+    for (x0, y0, x1, y1) in _ventanas_refinado(piramide, plantilla, threshold, niveles, ventana_refinado, iou_max):
+        ventanas += 1
+        xs_v, ys_v, punt_v = _buscar_completo(imagen[y0:y1, x0:x1], plantilla, threshold)
+        xs.append(xs_v + x0)
+        ys.append(ys_v + y0)
+        puntuaciones.append(punt_v)
+
+    if not ventanas:
+        return None
+    if not puntuaciones:
+        vacio = np.empty(0, dtype=np.int64)
+        return vacio, vacio, np.empty(0, dtype=np.float32)
+    return np.concatenate(xs), np.concatenate(ys), np.concatenate(puntuaciones)
+
+def find_template(screen_image_np, template_image_path, threshold=0.8, iou_max=0.3,
+                  niveles_piramide=0, ventana_refinado=8, piramide=None):
+    """
+    Busca una imagen de plantilla dentro de una imagen de pantalla.
+
+    :param screen_image_np: Imagen de pantalla (captura) como array de NumPy (en BGR).
+    :param template_image_path: Ruta a la imagen de plantilla (en BGR) o una Plantilla ya cargada.
+    :param threshold: Umbral de confianza (0.0 a 1.0).
+    :param iou_max: Solapamiento máximo (IoU) permitido entre dos coincidencias.
+    :param niveles_piramide: 0 = búsqueda completa; 1 = gruesa a 1/2; 2 = gruesa a 1/4.
+                             Se reduce si la plantilla pierde demasiado detalle a ese nivel, y si la
+                             pasada gruesa no encuentra nada se repite a resolución completa.
+    :param ventana_refinado: Margen en píxeles alrededor de cada pico grueso para el refinado.
+    :param piramide: Pirámide ya construida de screen_image_np (ver construir_piramide), opcional.
+    :return: Lista de tuplas (x, y, w, h, puntuacion) ordenada de mejor a peor coincidencia.
+    """
+    try:
+        if isinstance(template_image_path, Plantilla):
+            plantilla = template_image_path
+        else:
+            plantilla = template_store.obtener(template_image_path)
+        if plantilla is None:
+            log.warning(f"No se pudo cargar la plantilla {template_image_path}")
+            return []
+
+        t_h, t_w = plantilla.alto, plantilla.ancho
+
+        niveles = _niveles_utiles(plantilla, niveles_piramide)
+        candidatos = None
+        if niveles > 0:
+            if piramide is None or len(piramide) <= niveles:
+                piramide = construir_piramide(screen_image_np, niveles)
+            candidatos = _buscar_piramide(piramide, plantilla, threshold, niveles, ventana_refinado, iou_max)
+        if candidatos is None:
+            # Candidatos: máximos locales sobre el umbral (luego NMS por puntuación)
+            candidatos = _buscar_completo(screen_image_np, plantilla, threshold)
+        xs, ys, puntuaciones = candidatos
+
+        matches = _suprimir_no_maximos(xs, ys, puntuaciones, t_w, t_h, iou_max)
+
+        if matches:
+            log.debug(f"Plantilla {plantilla.ruta} encontrada en {len(matches)} ubicaciones.")
+
+        return matches
+
+    except Exception as e:
+        log.error(f"Error en find_template: {e}")
+        return []
+
+def comparar_piramide(imagen, plantilla, threshold=0.8, niveles_piramide=1, iou_max=0.3, tolerancia=1):
+    """
+    Comprueba que el modo pirámide encuentra lo mismo que la búsqueda completa.
+
+    :param tolerancia: Diferencia máxima en píxeles para considerar la misma coincidencia.
+    :return: (coincidencias completas, coincidencias con pirámide, completas que la pirámide no encontró)
+    """
+    completas = find_template(imagen, plantilla, threshold=threshold, iou_max=iou_max)
+    con_piramide = find_template(imagen, plantilla, threshold=threshold, iou_max=iou_max, niveles_piramide=niveles_piramide)
+    faltan = [c for c in completas
+              if not any(abs(c[0] - p[0]) <= tolerancia and abs(c[1] - p[1]) <= tolerancia for p in con_piramide)]
+    return completas, con_piramide, faltan
+
+def find_best(screen_image_np, template_image_path, threshold=0.8, umbral_seguro=None,
+              niveles_piramide=0, ventana_refinado=8, piramide=None):
+    """
+    Devuelve solo la mejor coincidencia usando cv2.minMaxLoc, sin extraer todos los candidatos.
+
+    :param umbral_seguro: En modo pirámide, deja de refinar picos en cuanto uno lo supera.
+                          Si la pasada gruesa no da ningún pico se busca a resolución completa.
+    :return: Tupla (x, y, w, h, puntuacion) o None si nada supera el umbral.
+    """
+    try:
+        if isinstance(template_image_path, Plantilla):
+            plantilla = template_image_path
+        else:
+            plantilla = template_store.obtener(template_image_path)
+        if plantilla is None:
+            log.warning(f"No se pudo cargar la plantilla {template_image_path}")
+            return None
+
+        t_h, t_w = plantilla.alto, plantilla.ancho
+
+        niveles = _niveles_utiles(plantilla, niveles_piramide)
+        if niveles > 0:
+            if piramide is None or len(piramide) <= niveles:
+                piramide = construir_piramide(screen_image_np, niveles)
+            imagen = piramide[0]
+
+            # Las ventanas llegan ordenadas por puntuación gruesa: se refinan de mejor a peor
+            mejor = None
+            ventanas = 0
+            for (x0, y0, x1, y1) in _ventanas_refinado(piramide, plantilla, threshold, niveles, ventana_refinado,
+                                                       max_picos=MAX_PICOS_PIRAMIDE):
+                ventanas += 1
+                result = cv2.matchTemplate(imagen[y0:y1, x0:x1], plantilla.imagen, cv2.TM_CCOEFF_NORMED)
+                cv2.patchNaNs(result, 0)
+                _, max_val, _, (x, y) = cv2.minMaxLoc(result)
+                if max_val >= threshold and (mejor is None or max_val > mejor[4]):
+                    mejor = (x + x0, y + y0, t_w, t_h, float(max_val))
+                    if umbral_seguro is not None and max_val >= umbral_seguro:
+                        break # Salida temprana: coincidencia segura
+            if ventanas:
+                return mejor
+            # Sin picos gruesos: la pasada rápida no puede descartar el elemento por sí sola
+
+        result = cv2.matchTemplate(screen_image_np, plantilla.imagen, cv2.TM_CCOEFF_NORMED)
+        cv2.patchNaNs(result, 0)
+        _, max_val, _, (x, y) = cv2.minMaxLoc(result)
+        if max_val < threshold:
+            return None
+        return (x, y, t_w, t_h, float(max_val))
+
+    except Exception as e:
+        log.error(f"Error en find_best: {e}")
+        return None
+
+def find_first(screen_image_np, template_image_path, threshold=0.8, **kwargs):
+    """Como find_best, pero se queda con el primer pico refinado que supere el umbral."""
+    return find_best(screen_image_np, template_image_path, threshold, umbral_seguro=threshold, **kwargs)
@@ -1,242 +1,396 @@
-import sys
-from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, 
-                               QLabel, QFileDialog, QLineEdit, QComboBox, 
-                               QGroupBox, QRubberBand, QScrollArea)
-from PySide6.QtGui import QPixmap, QPainter, QColor, QFont
-from PySide6.QtCore import Qt, QRect, QPoint, QSize
-import mss
-import mss.tools
-import json
-import os
-import logging
-
-from app.utils.config import guardar_perfil, cargar_perfil, RUTA_PERFILES
-
-log = logging.getLogger("QA_Tool.calibracion")
-
-# Widget de Label que permite dibujar rectángulos
-class CalibrationLabel(QLabel):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setMouseTracking(True)
-        self.origin = None
-        self.rubber_band = None
-        self.current_rect = QRect()
-        self.parent_tab = parent
-
-    def set_parent_tab(self, tab):
-        self.parent_tab = tab
-
-    def mousePressEvent(self, event):
-        if event.button() == Qt.MouseButton.LeftButton:
-            self.origin = event.pos()
-            if not self.rubber_band:
-                self.rubber_band = QRubberBand(QRubberBand.Shape.Rectangle, self)
-            self.rubber_band.setGeometry(QRect(self.origin, QSize()))
-            self.rubber_band.show()
-            log.debug(f"Inicio de selección de área en {self.origin}")
-
-    def mouseMoveEvent(self, event):
-        if self.rubber_band and self.origin:
-            self.rubber_band.setGeometry(QRect(self.origin, event.pos()).normalized())
-
-    def mouseReleaseEvent(self, event):
-        if event.button() == Qt.MouseButton.LeftButton and self.rubber_band:
-            self.current_rect = self.rubber_band.geometry()
-            self.rubber_band.hide()
-            self.origin = None
-            # Enviar el rectángulo (x, y, w, h) a la pestaña principal
-            if self.parent_tab:
-                log.debug(f"Área seleccionada: {self.current_rect}")
-                self.parent_tab.set_current_coords(self.current_rect)
-
-class CalibracionTab(QWidget):
-    def __init__(self):
-        super().__init__()
-        self.zonas_calibradas = {} # { "nombre_zona": (x, y, w, h), ... }
-        self.current_rect = None
-        self.current_pixmap = None # Almacenar pixmap original
-
-        layout = QHBoxLayout(self)
-        
-        # --- Columna Izquierda (Controles) ---
-        controles_layout = QVBoxLayout()
-        controles_layout.setSpacing(15)
-        
-        # Cargar/Guardar Perfil
-        group_perfil = QGroupBox("Perfiles de Calibración")
-        perfil_layout = QVBoxLayout()
-        self.combo_perfil = QComboBox()
-        self.actualizar_lista_perfiles()
-        
-        btn_cargar_perfil = QPushButton("Cargar Perfil")
-        btn_cargar_perfil.clicked.connect(self.cargar_perfil_seleccionado)
-        
-        self.nombre_perfil_input = QLineEdit("nuevo_perfil")
-        btn_guardar_perfil = QPushButton("Guardar Perfil Actual")
-        btn_guardar_perfil.clicked.connect(self.guardar_perfil_actual)
-        
-        perfil_layout.addWidget(QLabel("Seleccionar perfil existente:"))
-        perfil_layout.addWidget(self.combo_perfil)
-        perfil_layout.addWidget(btn_cargar_perfil)
-        perfil_layout.addSpacing(10)
-        perfil_layout.addWidget(QLabel("Guardar como nuevo perfil (ej: emulador_1920x1080):"))
-        perfil_layout.addWidget(self.nombre_perfil_input)
-        perfil_layout.addWidget(btn_guardar_perfil)
-        group_perfil.setLayout(perfil_layout)
-
-        # Cargar Imagen
-        group_imagen = QGroupBox("Fuente de Imagen")
-        imagen_layout = QVBoxLayout()
-        btn_capturar_pantalla = QPushButton("Capturar Pantalla Completa")
-        btn_capturar_pantalla.clicked.connect(self.capturar_pantalla)
-        btn_cargar_imagen_mock = QPushButton("Cargar Imagen de Prueba (desde test_images/)")
-        btn_cargar_imagen_mock.clicked.connect(self.cargar_imagen_mock)
-        imagen_layout.addWidget(btn_capturar_pantalla)
-        imagen_layout.addWidget(btn_cargar_imagen_mock)
-        group_imagen.setLayout(imagen_layout)
-
-        # Definir Zonas
-        group_zonas = QGroupBox("Definir Zonas")
-        zonas_layout = QVBoxLayout()
-        self.nombre_zona_input = QLineEdit("ej: BotonCambiarPantalla")
-        self.coords_label = QLabel("Coords (x, y, w, h): No definida")
-        btn_guardar_zona = QPushButton("Guardar Zona Actual")
-        btn_guardar_zona.clicked.connect(self.guardar_zona)
-        
-        zonas_layout.addWidget(QLabel("Nombre de la Zona:"))
-        zonas_layout.addWidget(self.nombre_zona_input)
-        zonas_layout.addWidget(self.coords_label)
-        zonas_layout.addWidget(btn_guardar_zona)
-        group_zonas.setLayout(zonas_layout)
-
-        controles_layout.addWidget(group_perfil)
-        controles_layout.addWidget(group_imagen)
-        controles_layout.addWidget(group_zonas)
-        controles_layout.addStretch()
-
-        # --- Columna Derecha (Visualizador) ---
-        scroll_area = QScrollArea()
-        scroll_area.setWidgetResizable(True)
-        
-        self.image_label = CalibrationLabel()
-        self.image_label.set_parent_tab(self)
-        self.image_label.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft)
-        
-        scroll_area.setWidget(self.image_label)
-        
-        layout.addLayout(controles_layout, 1) # 1 parte de espacio
-        layout.addWidget(scroll_area, 3)         # 3 partes de espacio
-
-    def set_pixmap(self, pixmap):
-        """Establece el pixmap base y lo muestra."""
-        self.current_pixmap = pixmap
-        self.image_label.setPixmap(self.current_pixmap)
-        
-    def capturar_pantalla(self):
-        try:
-            with mss.mss() as sct:
-                monitor = sct.monitors[0] # Captura todos los monitores como uno solo
-                sct_img = sct.grab(monitor)
-                log.info(f"Pantalla capturada: {sct_img.size}")
-                
-                # Convertir a QPixmap
-                img_bytes = mss.tools.to_png(sct_img.rgb, sct_img.size)
-                pixmap = QPixmap()
-                pixmap.loadFromData(img_bytes)
-                self.set_pixmap(pixmap)
-                self.zonas_calibradas.clear() # Limpiar zonas al tomar nueva captura
-                
-        except Exception as e:
-            log.error(f"Error al capturar pantalla: {e}")
-            self.coords_label.setText(f"Error: {e}")
-
-    def cargar_imagen_mock(self):
-        filepath, _ = QFileDialog.getOpenFileName(
-            self, "Seleccionar Imagen Mock", "test_images/", "Images (*.png *.jpg *.bmp)"
-        )
-        if filepath:
-            pixmap = QPixmap(filepath)
-            self.set_pixmap(pixmap)
-            self.zonas_calibradas.clear() # Limpiar zonas al cargar nueva imagen
-            log.info(f"Imagen mock cargada: {filepath}")
-
-    def set_current_coords(self, rect):
-        self.current_rect = rect
-        self.coords_label.setText(f"Coords: ({rect.x()}, {rect.y()}, {rect.width()}, {rect.height()})")
-
-    def guardar_zona(self):
-        nombre_zona = self.nombre_zona_input.text()
-        if not nombre_zona or not self.current_rect:
-            self.coords_label.setText("Error: Define un nombre y selecciona un área")
-            log.warning("Intento de guardar zona sin nombre o área.")
-            return
-            
-        coords = (self.current_rect.x(), self.current_rect.y(), self.current_rect.width(), self.current_rect.height())
-        self.zonas_calibradas[nombre_zona] = coords
-        log.info(f"Zona guardada: {nombre_zona} -> {coords}")
-        self.coords_label.setText(f"Guardado: {nombre_zona}")
-        
-        # Dibujar el rectángulo guardado
-        self.dibujar_rectangulos_guardados()
-
-    def dibujar_rectangulos_guardados(self):
-        if not self.current_pixmap:
-            return
-            
-        # Empezar desde la imagen original limpia
-        temp_pixmap = self.current_pixmap.copy()
-        painter = QPainter(temp_pixmap)
-        font = self.font()
-        font.setPointSize(10)
-        painter.setFont(font)
-        
-        for nombre, (x, y, w, h) in self.zonas_calibradas.items():
-            rect = QRect(x, y, w, h)
-            
-            # Dibujar rectángulo
-            painter.setPen(QColor(255, 0, 0, 200)) # Rojo semi-transparente
-            painter.drawRect(rect)
-            
-            # Dibujar texto con fondo
-            painter.setPen(Qt.GlobalColor.white)
-            text_rect = QRect(rect.topLeft() - QPoint(0, 15), QSize(len(nombre) * 8, 15))
-            painter.fillRect(text_rect, QColor(0, 0, 0, 150)) # Fondo negro semi-transparente
-            painter.drawText(text_rect, Qt.AlignmentFlag.AlignCenter, nombre)
-            
-        painter.end()
-        self.image_label.setPixmap(temp_pixmap)
-
-    def guardar_perfil_actual(self):
-        nombre = self.nombre_perfil_input.text()
-        if not nombre.endswith(".json"):
-            nombre += ".json"
-        
-        if guardar_perfil(nombre, self.zonas_calibradas):
-            log.info(f"Perfil guardado: {nombre}")
-            self.actualizar_lista_perfiles()
-            self.combo_perfil.setCurrentText(nombre)
-        else:
-            log.error(f"No se pudo guardar el perfil {nombre}")
-
-    def cargar_perfil_seleccionado(self):
-        nombre = self.combo_perfil.currentText()
-        if not nombre:
-            return
-            
-        data = cargar_perfil(nombre)
-        if data:
-            self.zonas_calibradas = data
-            self.nombre_perfil_input.setText(nombre.replace(".json", ""))
-            self.dibujar_rectangulos_guardados()
-            log.info(f"Perfil cargado: {nombre}")
-        else:
-            log.warning(f"No se pudo cargar el perfil {nombre}")
-
-    def actualizar_lista_perfiles(self):
-        self.combo_perfil.clear()
-        try:
-            perfiles = [f for f in os.listdir(RUTA_PERFILES) if f.endswith(".json")]
-            self.combo_perfil.addItems(perfiles)
-        except FileNotFoundError:
+import sys
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, 
+                               QLabel, QFileDialog, QLineEdit, QComboBox, 
+                               QGroupBox, QRubberBand, QGraphicsView, QGraphicsScene,
+                               QGraphicsRectItem, QGraphicsSimpleTextItem, QGraphicsItem)
+from PySide6.QtGui import QPixmap, QImage, QPen, QColor
+from PySide6.QtCore import Qt, QRect, QRectF, QSize, QThread, Signal
+import mss
+import json
+import os
+import logging
+
+from app.utils.config import (guardar_perfil, cargar_perfil, listar_plantillas, normalizar_zonas, zonas_de_perfil,
+                              RUTA_PERFILES)
+from app.logic.autocalibracion import descubrir_zonas
+
+log = logging.getLogger("QA_Tool.calibracion")
+
+TAM_MOSAICO = 1024 # Lado de cada mosaico de la captura (las capturas enormes no van en un único QPixmap)
+
+def imagen_desde_bgra(raw, ancho, alto):
+    """
+    QImage sobre un buffer BGRA crudo (p. ej. ScreenShot.raw de mss), sin pasar por PNG.
+    El QImage no copia el buffer: hay que mantener `raw` vivo mientras se use.
+    """
+    return QImage(raw, ancho, alto, ancho * 4, QImage.Format.Format_RGB32)
+
+class ZonaItem(QGraphicsRectItem):
+    """Rectángulo de una zona calibrada con su nombre, en la capa superior del lienzo."""
+    def __init__(self, nombre, rect):
+        super().__init__()
+        pen = QPen(QColor(255, 0, 0, 200)) # Rojo semi-transparente
+        pen.setCosmetic(True) # Mismo grosor con cualquier zoom
+        self.setPen(pen)
+        self.setZValue(1)
+        self.etiqueta = QGraphicsSimpleTextItem(nombre, self)
+        self.etiqueta.setBrush(Qt.GlobalColor.white)
+        font = self.etiqueta.font()
+        font.setPointSize(10)
+        self.etiqueta.setFont(font)
+        self.etiqueta.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIgnoresTransformations) # Legible con zoom
+        self.fondo = QGraphicsRectItem(self.etiqueta.boundingRect(), self.etiqueta)
+        self.fondo.setBrush(QColor(0, 0, 0, 150)) # Fondo negro semi-transparente
+        self.fondo.setPen(Qt.PenStyle.NoPen)
+        self.fondo.setFlag(QGraphicsItem.GraphicsItemFlag.ItemStacksBehindParent)
+        self.mover(rect)
+
+    def mover(self, rect):
+        x, y, w, h = rect
+        self.setRect(QRectF(x, y, w, h))
+        self.etiqueta.setPos(x, y - 15)
+
+# Lienzo de calibración: captura en mosaicos con zoom y una capa de zonas encima
+class CalibrationView(QGraphicsView):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setScene(QGraphicsScene(self))
+        self.setDragMode(QGraphicsView.DragMode.NoDrag)
+        self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
+        self.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft)
+        self.origin = None
+        self.rubber_band = None
+        self.current_rect = QRect()
+        self.parent_tab = parent
+        self.mosaicos = []
+        self.zonas = {} # { nombre: ZonaItem }
+
+    def set_parent_tab(self, tab):
+        self.parent_tab = tab
+
+    def set_imagen(self, imagen):
+        """Sustituye la imagen de fondo, troceada en mosaicos de TAM_MOSAICO px."""
+        for mosaico in self.mosaicos:
+            self.scene().removeItem(mosaico)
+        self.mosaicos = []
+        for y in range(0, imagen.height(), TAM_MOSAICO):
+            for x in range(0, imagen.width(), TAM_MOSAICO):
+                trozo = imagen.copy(x, y, min(TAM_MOSAICO, imagen.width() - x), min(TAM_MOSAICO, imagen.height() - y))
+                mosaico = self.scene().addPixmap(QPixmap.fromImage(trozo))
+                mosaico.setPos(x, y)
+                mosaico.setZValue(0)
+                self.mosaicos.append(mosaico)
+        self.scene().setSceneRect(0, 0, imagen.width(), imagen.height())
+        log.debug(f"Imagen de calibración: {imagen.width()}x{imagen.height()} en {len(self.mosaicos)} mosaicos")
+
+    # --- Capa de zonas: solo se toca la zona que cambia ---
+
+    def poner_zona(self, nombre, rect):
+        zona = self.zonas.get(nombre)
+        if zona is None:
+            zona = ZonaItem(nombre, rect)
+            self.scene().addItem(zona)
+            self.zonas[nombre] = zona
+        else:
+            zona.mover(rect)
+
+    def quitar_zona(self, nombre):
+        zona = self.zonas.pop(nombre, None)
+        if zona is not None:
+            self.scene().removeItem(zona)
+
+    def limpiar_zonas(self):
+        for nombre in list(self.zonas):
+            self.quitar_zona(nombre)
+
+    # --- Zoom (Ctrl + rueda) y selección de áreas ---
+
+    def wheelEvent(self, event):
+        if event.modifiers() & Qt.KeyboardModifier.ControlModifier:
+            factor = 1.25 if event.angleDelta().y() > 0 else 0.8
+            escala = self.transform().m11() * factor
+            if 0.05 <= escala <= 16:
+                self.scale(factor, factor)
+            event.accept()
+        else:
+            super().wheelEvent(event)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            self.origin = event.pos()
+            if not self.rubber_band:
+                self.rubber_band = QRubberBand(QRubberBand.Shape.Rectangle, self.viewport())
+            self.rubber_band.setGeometry(QRect(self.origin, QSize()))
+            self.rubber_band.show()
+            log.debug(f"Inicio de selección de área en {self.origin}")
+        else:
+            super().mousePressEvent(event)
+
+    def mouseMoveEvent(self, event):
+        if self.rubber_band and self.origin:
+            self.rubber_band.setGeometry(QRect(self.origin, event.pos()).normalized())
+        else:
+            super().mouseMoveEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton and self.rubber_band:
+            self.rubber_band.hide()
+            self.origin = None
+            # Del viewport a píxeles de la imagen (independiente del zoom y del scroll)
+            area = self.mapToScene(self.rubber_band.geometry()).boundingRect()
+            area = area.intersected(self.scene().sceneRect())
+            self.current_rect = area.toAlignedRect()
+            # Enviar el rectángulo (x, y, w, h) a la pestaña principal
+            if self.parent_tab:
+                log.debug(f"Área seleccionada: {self.current_rect}")
+                self.parent_tab.set_current_coords(self.current_rect)
+        else:
+            super().mouseReleaseEvent(event)
+
+class AutocalibracionWorker(QThread):
+    """Ejecuta descubrir_zonas fuera del hilo de la GUI."""
+    progreso = Signal(int) # Fotogramas analizados
+    terminado = Signal(object, object, object) # (zonas, estadisticas, resolución de la grabación)
+    error = Signal(str)
+
+    def __init__(self, origen, plantillas):
+        super().__init__()
+        self.origen = origen
+        self.plantillas = plantillas
+
+    def run(self):
+        try:
+            zonas, estadisticas, resolucion = descubrir_zonas(self.origen, self.plantillas, al_progreso=self.progreso.emit)
+            self.terminado.emit(zonas, estadisticas, resolucion)
+        except Exception as e:
+            log.error(f"Error en la autocalibración: {e}")
+            self.error.emit(str(e))
+
+class CalibracionTab(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.zonas_calibradas = {} # { "nombre_zona": (x, y, w, h), ... }
+        self.current_rect = None
+        self.current_image = None # Imagen original (QImage, en píxeles de pantalla)
+        self.resolucion_perfil = None # Resolución de referencia del perfil cargado (si es normalizado)
+        self.autocalibracion = None # AutocalibracionWorker en curso
+
+        layout = QHBoxLayout(self)
+        
+        # --- Columna Izquierda (Controles) ---
+        controles_layout = QVBoxLayout()
+        controles_layout.setSpacing(15)
+        
+        # Cargar/Guardar Perfil
+        group_perfil = QGroupBox("Perfiles de Calibración")
+        perfil_layout = QVBoxLayout()
+        self.combo_perfil = QComboBox()
+        self.actualizar_lista_perfiles()
+        
+        btn_cargar_perfil = QPushButton("Cargar Perfil")
+        btn_cargar_perfil.clicked.connect(self.cargar_perfil_seleccionado)
+        
+        self.nombre_perfil_input = QLineEdit("nuevo_perfil")
+        btn_guardar_perfil = QPushButton("Guardar Perfil Actual")
+        btn_guardar_perfil.clicked.connect(self.guardar_perfil_actual)
+        
+        perfil_layout.addWidget(QLabel("Seleccionar perfil existente:"))
+        perfil_layout.addWidget(self.combo_perfil)
+        perfil_layout.addWidget(btn_cargar_perfil)
+        perfil_layout.addSpacing(10)
+        perfil_layout.addWidget(QLabel("Guardar como nuevo perfil (ej: emulador_1920x1080):"))
+        perfil_layout.addWidget(self.nombre_perfil_input)
+        perfil_layout.addWidget(btn_guardar_perfil)
+        group_perfil.setLayout(perfil_layout)
+
+        # Cargar Imagen
+        group_imagen = QGroupBox("Fuente de Imagen")
+        imagen_layout = QVBoxLayout()
+        btn_capturar_pantalla = QPushButton("Capturar Pantalla Completa")
+        btn_capturar_pantalla.clicked.connect(self.capturar_pantalla)
+        btn_cargar_imagen_mock = QPushButton("Cargar Imagen de Prueba (desde test_images/)")
+        btn_cargar_imagen_mock.clicked.connect(self.cargar_imagen_mock)
+        imagen_layout.addWidget(btn_capturar_pantalla)
+        imagen_layout.addWidget(btn_cargar_imagen_mock)
+        group_imagen.setLayout(imagen_layout)
+
+        # Definir Zonas
+        group_zonas = QGroupBox("Definir Zonas")
+        zonas_layout = QVBoxLayout()
+        self.nombre_zona_input = QLineEdit("ej: BotonCambiarPantalla")
+        self.coords_label = QLabel("Coords (x, y, w, h): No definida")
+        btn_guardar_zona = QPushButton("Guardar Zona Actual")
+        btn_guardar_zona.clicked.connect(self.guardar_zona)
+        
+        zonas_layout.addWidget(QLabel("Nombre de la Zona:"))
+        zonas_layout.addWidget(self.nombre_zona_input)
+        zonas_layout.addWidget(self.coords_label)
+        zonas_layout.addWidget(btn_guardar_zona)
+        group_zonas.setLayout(zonas_layout)
+
+        controles_layout.addWidget(group_perfil)
+        controles_layout.addWidget(group_imagen)
+        # Autocalibración: zonas de búsqueda a partir de una grabación
+        group_auto = QGroupBox("Autocalibración")
+        auto_layout = QVBoxLayout()
+        self.btn_autocalibrar = QPushButton("Proponer Zonas de Búsqueda (desde grabación)")
+        self.btn_autocalibrar.clicked.connect(self.autocalibrar)
+        self.auto_label = QLabel("Añade '<elemento>_ZonaBusqueda' a las zonas y guarda el perfil.")
+        self.auto_label.setWordWrap(True)
+        auto_layout.addWidget(self.btn_autocalibrar)
+        auto_layout.addWidget(self.auto_label)
+        group_auto.setLayout(auto_layout)
+
+        controles_layout.addWidget(group_zonas)
+        controles_layout.addWidget(group_auto)
+        controles_layout.addStretch()
+
+        # --- Columna Derecha (Visualizador, Ctrl + rueda para zoom) ---
+        self.image_view = CalibrationView()
+        self.image_view.set_parent_tab(self)
+        
+        layout.addLayout(controles_layout, 1) # 1 parte de espacio
+        layout.addWidget(self.image_view, 3)     # 3 partes de espacio
+
+    def set_imagen(self, imagen):
+        """Establece la imagen base (QImage) y la muestra."""
+        self.current_image = imagen
+        self.image_view.set_imagen(imagen)
+        
+    def capturar_pantalla(self):
+        try:
+            with mss.mss() as sct:
+                monitor = sct.monitors[1] # El monitor que captura la ejecución (resolución de referencia del perfil)
+                sct_img = sct.grab(monitor)
+                log.info(f"Pantalla capturada: {sct_img.size}")
+                
+                # Del buffer BGRA crudo a QImage, sin codificar a PNG (copy() para soltar el buffer de mss)
+                imagen = imagen_desde_bgra(sct_img.raw, sct_img.width, sct_img.height).copy()
+                self.set_imagen(imagen)
+                self.zonas_calibradas.clear() # Limpiar zonas al tomar nueva captura
+                self.image_view.limpiar_zonas()
+                
+        except Exception as e:
+            log.error(f"Error al capturar pantalla: {e}")
+            self.coords_label.setText(f"Error: {e}")
+
+    def cargar_imagen_mock(self):
+        filepath, _ = QFileDialog.getOpenFileName(
+            self, "Seleccionar Imagen Mock", "test_images/", "Images (*.png *.jpg *.bmp)"
+        )
+        if filepath:
+            self.set_imagen(QImage(filepath))
+            self.zonas_calibradas.clear() # Limpiar zonas al cargar nueva imagen
+            self.image_view.limpiar_zonas()
+            log.info(f"Imagen mock cargada: {filepath}")
+
+    def set_current_coords(self, rect):
+        self.current_rect = rect
+        self.coords_label.setText(f"Coords: ({rect.x()}, {rect.y()}, {rect.width()}, {rect.height()})")
+
+    def guardar_zona(self):
+        nombre_zona = self.nombre_zona_input.text()
+        if not nombre_zona or not self.current_rect:
+            self.coords_label.setText("Error: Define un nombre y selecciona un área")
+            log.warning("Intento de guardar zona sin nombre o área.")
+            return
+            
+        coords = (self.current_rect.x(), self.current_rect.y(), self.current_rect.width(), self.current_rect.height())
+        self.zonas_calibradas[nombre_zona] = coords
+        log.info(f"Zona guardada: {nombre_zona} -> {coords}")
+        self.coords_label.setText(f"Guardado: {nombre_zona}")
+        
+        # Dibujar solo el rectángulo guardado (la imagen y las demás zonas no se tocan)
+        self.image_view.poner_zona(nombre_zona, coords)
+
+    def dibujar_rectangulos_guardados(self):
+        """Sustituye la capa de zonas por las de zonas_calibradas (p. ej. al cargar un perfil)."""
+        self.image_view.limpiar_zonas()
+        for nombre, rect in self.zonas_calibradas.items():
+            self.image_view.poner_zona(nombre, rect)
+
+    def autocalibrar(self):
+        filepath, _ = QFileDialog.getOpenFileName(
+            self, "Seleccionar Grabación", "logs/",
+            "Grabaciones (*.sesion *.png *.jpg *.bmp *.mp4 *.avi *.mkv *.mov *.webm);;Todos (*)"
+        )
+        if not filepath:
+            return
+        try:
+            plantillas = listar_plantillas()
+        except FileNotFoundError as e:
+            self.auto_label.setText(f"Error: {e}")
+            return
+
+        self.btn_autocalibrar.setEnabled(False)
+        self.auto_label.setText("Analizando grabación...")
+        self.autocalibracion = AutocalibracionWorker(filepath, plantillas)
+        self.autocalibracion.progreso.connect(lambda n: self.auto_label.setText(f"Analizando grabación... {n} fotogramas"))
+        self.autocalibracion.terminado.connect(self.autocalibracion_terminada)
+        self.autocalibracion.error.connect(lambda msg: self.auto_label.setText(f"Error: {msg}"))
+        self.autocalibracion.finished.connect(lambda: self.btn_autocalibrar.setEnabled(True))
+        self.autocalibracion.start()
+
+    def resolucion_actual(self):
+        """(ancho, alto) en que están las zonas del editor: la imagen cargada o, sin ella, la del perfil."""
+        if self.current_image is not None:
+            return (self.current_image.width(), self.current_image.height())
+        return self.resolucion_perfil
+
+    def autocalibracion_terminada(self, zonas, estadisticas, resolucion):
+        """Añade las zonas propuestas (sin pisar las calibradas a mano) y guarda el perfil."""
+        destino = self.resolucion_actual()
+        if destino and tuple(destino) != tuple(resolucion):
+            # Grabación a otra resolución que la imagen del editor
+            zonas, _ = zonas_de_perfil(normalizar_zonas(zonas, resolucion), destino)
+        elif not destino:
+            self.resolucion_perfil = tuple(resolucion)
+        nuevas = [nombre for nombre in zonas if nombre not in self.zonas_calibradas]
+        for nombre in nuevas:
+            self.zonas_calibradas[nombre] = tuple(zonas[nombre])
+            self.image_view.poner_zona(nombre, zonas[nombre])
+        sin_zona = [nombre for nombre, datos in estadisticas.items() if not datos["zona"]]
+        log.info(f"Autocalibración: {len(nuevas)} zonas nuevas; sin zona: {sin_zona}")
+        self.auto_label.setText(f"{len(nuevas)} zonas nuevas ({len(zonas) - len(nuevas)} ya existían). "
+                                f"Sin zona: {', '.join(sin_zona) or '-'}")
+        if nuevas:
+            self.guardar_perfil_actual()
+
+    def guardar_perfil_actual(self):
+        nombre = self.nombre_perfil_input.text()
+        if not nombre.endswith(".json"):
+            nombre += ".json"
+        
+        # Normalizado respecto a la resolución de la imagen: vale para cualquier otra resolución
+        resolucion = self.resolucion_actual()
+        datos = normalizar_zonas(self.zonas_calibradas, resolucion) if resolucion else self.zonas_calibradas
+        if guardar_perfil(nombre, datos):
+            log.info(f"Perfil guardado: {nombre}")
+            self.actualizar_lista_perfiles()
+            self.combo_perfil.setCurrentText(nombre)
+        else:
+            log.error(f"No se pudo guardar el perfil {nombre}")
+
+    def cargar_perfil_seleccionado(self):
+        nombre = self.combo_perfil.currentText()
+        if not nombre:
+            return
+            
+        data = cargar_perfil(nombre)
+        if data:
+            # Perfiles normalizados: zonas en píxeles de la imagen actual (o de su resolución de referencia)
+            self.resolucion_perfil = None
+            self.zonas_calibradas, self.resolucion_perfil = zonas_de_perfil(data, self.resolucion_actual())
+            self.nombre_perfil_input.setText(nombre.replace(".json", ""))
+            self.dibujar_rectangulos_guardados()
+            log.info(f"Perfil cargado: {nombre}")
+        else:
+            log.warning(f"No se pudo cargar el perfil {nombre}")
+
+    def actualizar_lista_perfiles(self):
+        self.combo_perfil.clear()
+        try:
+            perfiles = [f for f in os.listdir(RUTA_PERFILES) if f.endswith(".json")]
+            self.combo_perfil.addItems(perfiles)
+        except FileNotFoundError:
             log.warning(f"No se encontró el directorio de perfiles: {RUTA_PERFILES}")
\ No newline at end of file
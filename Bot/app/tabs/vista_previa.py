@@ -0,0 +1,112 @@
+from PySide6.QtWidgets import QWidget, QSizePolicy
+from PySide6.QtGui import QImage, QPainter, QColor, QPen, QFont
+from PySide6.QtCore import Qt, QTimer, QRectF, QPointF
+import logging
+
+log = logging.getLogger("QA_Tool.vista_previa")
+
+COLOR_ZONA = QColor(255, 200, 0)
+COLOR_COINCIDENCIA = QColor(0, 220, 0)
+COLOR_FONDO = QColor(30, 30, 30)
+
+class VistaPreviaWidget(QWidget):
+    """
+    Vista en vivo de lo que ve el motor: el último fotograma con las zonas de
+    búsqueda y las últimas coincidencias encima.
+
+    Las imágenes se envuelven en QImage directamente sobre los buffers NumPy del
+    anillo de captura (sin copia) y QPainter las reduce al tamaño del widget de una
+    vez. El refresco va a `fps_max` como mucho, solo con fotogramas nuevos, y el
+    temporizador se para mientras el widget está oculto: sin CPU si no se ve.
+    """
+    def __init__(self, parent=None, fps_max=10):
+        super().__init__(parent)
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        self.setMinimumHeight(120)
+        self.proveedor = None # Callable(secuencia_previa) -> (cuadro, zonas, resultados) | None
+        self._secuencia = 0
+        self._imagen = None # Fotograma ya reducido y con las marcas dibujadas
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(int(1000 / max(fps_max, 1)))
+        self._timer.timeout.connect(self.refrescar)
+
+    def conectar(self, proveedor):
+        """:param proveedor: Normalmente MotorAutomatizacion.vista_previa."""
+        self.proveedor = proveedor
+        self._secuencia = 0
+        if self.isVisible():
+            self._timer.start()
+
+    def desconectar(self):
+        """Deja de pedir fotogramas (se mantiene el último dibujado)."""
+        self.proveedor = None
+        self._timer.stop()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.proveedor is not None:
+            self._timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self._timer.stop()
+
+    def refrescar(self):
+        if self.proveedor is None:
+            return
+        datos = self.proveedor(self._secuencia)
+        if datos is None:
+            return # Sin fotograma nuevo
+        cuadro, zonas, resultados = datos
+        with cuadro: # Devuelve el buffer al anillo en cuanto está dibujado
+            self._secuencia = cuadro.secuencia
+            self._imagen = self._componer(cuadro.fotograma, zonas, resultados)
+        self.update()
+
+    def _componer(self, fotograma, zonas, resultados):
+        escala = min(self.width() / fotograma.ancho, self.height() / fotograma.alto)
+        ancho, alto = max(1, int(fotograma.ancho * escala)), max(1, int(fotograma.alto * escala))
+        imagen = QImage(ancho, alto, QImage.Format.Format_RGB32)
+        imagen.fill(COLOR_FONDO)
+
+        def a_vista(rect):
+            x, y, w, h = rect
+            return QRectF(x * escala, y * escala, w * escala, h * escala)
+
+        painter = QPainter(imagen)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        for rect, buffer in fotograma.regiones:
+            alto_buffer, ancho_buffer = buffer.shape[:2]
+            # QImage sobre la memoria del buffer (BGR contiguo): sin copia; solo se copia al reducir
+            origen = QImage(buffer.data, ancho_buffer, alto_buffer, buffer.strides[0], QImage.Format.Format_BGR888)
+            painter.drawImage(a_vista(rect), origen)
+
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        painter.setPen(QPen(COLOR_ZONA, 1, Qt.PenStyle.DashLine))
+        for zona in zonas.values():
+            if zona:
+                painter.drawRect(a_vista(zona))
+
+        painter.setFont(QFont("Arial", 8))
+        painter.setPen(QPen(COLOR_COINCIDENCIA, 2))
+        for clave, coincidencias in resultados.items():
+            for (x, y, w, h, puntuacion) in coincidencias:
+                caja = a_vista((x, y, w, h))
+                painter.drawRect(caja)
+                painter.drawText(caja.bottomLeft() + QPointF(0, 10), f"{clave} {puntuacion:.2f}")
+        painter.end()
+        return imagen
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), COLOR_FONDO)
+        if self._imagen is not None:
+            # Centrada; si el widget cambió de tamaño se ajusta en el siguiente fotograma
+            x = (self.width() - self._imagen.width()) // 2
+            y = (self.height() - self._imagen.height()) // 2
+            painter.drawImage(x, y, self._imagen)
+        else:
+            painter.setPen(QColor(160, 160, 160))
+            painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, "Vista previa: sin ejecución en curso")
+        painter.end()
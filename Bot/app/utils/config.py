@@ -1,35 +1,79 @@
-import json
-import os
-
-RUTA_PERFILES = "resources/profiles"
-
-def guardar_perfil(nombre_archivo, data):
-    """Guarda un diccionario de datos en un archivo JSON en la carpeta de perfiles."""
-    os.makedirs(RUTA_PERFILES, exist_ok=True)
-    ruta_completa = os.path.join(RUTA_PERFILES, nombre_archivo)
-    
-    try:
-        with open(ruta_completa, 'w') as f:
-            json.dump(data, f, indent=4)
-        print(f"Perfil guardado en {ruta_completa}")
-        return True
-    except Exception as e:
-        print(f"Error al guardar perfil {nombre_archivo}: {e}")
-        return False
-
-def cargar_perfil(nombre_archivo):
-    """Carga datos desde un archivo JSON en la carpeta de perfiles."""
-    ruta_completa = os.path.join(RUTA_PERFILES, nombre_archivo)
-    
-    if not os.path.exists(ruta_completa):
-        print(f"Error: No se encuentra el perfil {ruta_completa}")
-        return None
-        
-    try:
-        with open(ruta_completa, 'r') as f:
-            data = json.load(f)
-        print(f"Perfil {nombre_archivo} cargado.")
-        return data
-    except Exception as e:
-        print(f"Error al cargar perfil {nombre_archivo}: {e}")
-        return None
\ No newline at end of file
+import json
+import os
+
+RUTA_PERFILES = "resources/profiles"
+RUTA_TEMPLATES = "resources/templates"
+EXTENSIONES_PLANTILLA = (".png", ".jpg")
+
+def guardar_perfil(nombre_archivo, data):
+    """Guarda un diccionario de datos en un archivo JSON en la carpeta de perfiles."""
+    os.makedirs(RUTA_PERFILES, exist_ok=True)
+    ruta_completa = os.path.join(RUTA_PERFILES, nombre_archivo)
+    
+    try:
+        with open(ruta_completa, 'w') as f:
+            json.dump(data, f, indent=4)
+        print(f"Perfil guardado en {ruta_completa}")
+        return True
+    except Exception as e:
+        print(f"Error al guardar perfil {nombre_archivo}: {e}")
+        return False
+
+def cargar_perfil(nombre_archivo):
+    """Carga datos desde un archivo JSON en la carpeta de perfiles."""
+    ruta_completa = os.path.join(RUTA_PERFILES, nombre_archivo)
+    
+    if not os.path.exists(ruta_completa):
+        print(f"Error: No se encuentra el perfil {ruta_completa}")
+        return None
+        
+    try:
+        with open(ruta_completa, 'r') as f:
+            data = json.load(f)
+        print(f"Perfil {nombre_archivo} cargado.")
+        return data
+    except Exception as e:
+        print(f"Error al cargar perfil {nombre_archivo}: {e}")
+        return None
+
+def listar_plantillas(ruta=RUTA_TEMPLATES):
+    """Devuelve { nombre_elemento: ruta_plantilla } con las imágenes de la carpeta de templates."""
+    plantillas = {}
+    for f in sorted(os.listdir(ruta)):
+        if f.endswith(EXTENSIONES_PLANTILLA):
+            plantillas[os.path.splitext(f)[0]] = os.path.join(ruta, f)
+    return plantillas
+
+CLAVE_RESOLUCION = "_resolucion_referencia" # Perfiles normalizados: [ancho, alto] de la pantalla calibrada
+
+def normalizar_zonas(zonas, resolucion):
+    """
+    Pasa zonas en píxeles a un perfil independiente de la resolución:
+    cada zona como fracción (0-1) del ancho/alto de `resolucion`, más la resolución de referencia.
+    """
+    ancho, alto = resolucion
+    perfil = {CLAVE_RESOLUCION: [int(ancho), int(alto)]}
+    for nombre, (x, y, w, h) in zonas.items():
+        perfil[nombre] = [round(x / ancho, 6), round(y / alto, 6), round(w / ancho, 6), round(h / alto, 6)]
+    return perfil
+
+def zonas_de_perfil(perfil, resolucion=None):
+    """
+    Zonas en píxeles de un perfil, normalizado o antiguo (píxeles absolutos).
+
+    :param resolucion: (ancho, alto) destino; None = la de referencia del perfil.
+    :return: (zonas { nombre: (x, y, w, h) }, resolución de referencia o None si el perfil es absoluto).
+             Los perfiles absolutos se devuelven tal cual (no se pueden reescalar).
+    """
+    referencia = perfil.get(CLAVE_RESOLUCION)
+    if not referencia:
+        return {nombre: tuple(rect) for nombre, rect in perfil.items()}, None
+    referencia = tuple(referencia)
+    ancho, alto = resolucion or referencia
+    zonas = {}
+    for nombre, rect in perfil.items():
+        if nombre == CLAVE_RESOLUCION:
+            continue
+        x, y, w, h = rect
+        zonas[nombre] = (round(x * ancho), round(y * alto), max(1, round(w * ancho)), max(1, round(h * alto)))
+    return zonas, referencia